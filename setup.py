@@ -18,9 +18,12 @@ setuptools.setup(
         "pillow",
         "openpyxl",
         "beautifulsoup4",
-        "threadpool",
         "tqdm",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+        "numpy": ["numpy"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
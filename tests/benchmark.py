@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: benchmark.py
+@time: 2026/10/18 20:00
+
+不需要网络和账号的性能测试，所有请求都由 wechat_mp.testing.FakeBackend 响应
+
+    python tests/benchmark.py --articles 5000
+    python tests/benchmark.py --only import --import-budget 300
+    python tests/benchmark.py --only memory --articles 200000
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wechat_mp import WeChat, profile
+from wechat_mp.models import Article, ArticleWithContent, ArticleSearchResult, ArticleTable
+from wechat_mp.ratelimit import RateLimiter
+from wechat_mp.testing import FakeBackend
+from wechat_mp.utils import extract_cgi_data
+
+
+def timed(func, repeat=3):
+    """执行repeat次，返回最快的秒数和最后一次的结果"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def make_client(backend):
+    """使用FakeBackend的已登陆客户端，限速器几乎不等待，只测量客户端本身的开销"""
+    client = WeChat.from_account({'email': 'benchmark@example.com', 'token': backend.token,
+                                  'verified_time': time.time()}, adapter=backend)
+    client.rate_limiter = RateLimiter(namespace='benchmark', rate=1e6, min_rate=1e5, max_rate=1e6, backoff=0.001)
+    return client
+
+
+def bench_pagination(args):
+    rows = []
+    for workers, throttle_every in ((1, 0), (args.workers, 0), (1, 10), (args.workers, 10)):
+        backend = FakeBackend(articles=args.articles, throttle_every=throttle_every, latency=args.latency)
+        client = make_client(backend)
+        account = client.search_account("benchmark", limit=1)[0]
+        seconds, result = timed(lambda: account.articles(workers=workers), args.repeat)
+        pages = -(-args.articles // 5)
+        rows.append((f"articles workers={workers} throttle_every={throttle_every}", seconds,
+                     f"{pages / seconds:,.0f} 页/秒 {result.total / seconds:,.0f} 篇/秒"))
+
+    backend = FakeBackend(search_articles=args.articles // 4, latency=args.latency)
+    client = make_client(backend)
+    seconds, result = timed(lambda: client.search_article("benchmark"), args.repeat)
+    rows.append(("search_article", seconds, f"{result.total / seconds:,.0f} 篇/秒"))
+    return rows
+
+
+def legacy_extract_cgi_data(data_str):
+    """改用 extract_cgi_data 之前 get_user_propery 逐行用正则改写成json再解析的实现，只用于对比速度"""
+    p = re.compile(r'window.cgiData = (\{[\s\S]*\});')
+    raw_string = p.findall(data_str)[0]
+    p = re.compile(r'\+\("(\d*)"\) \|\| 0')
+    p2 = re.compile(r'\s*(.*?): ')
+    new_string = ""
+    for l in raw_string.split("\n"):
+        r = p.findall(l)
+        r2 = p2.findall(l)
+
+        if r:
+            value = f'"count": {r[0]}'
+            new_string += value
+
+        if r2:
+            if "count" not in l:
+                value = f'"{r2[0]}": '
+                new_line = re.sub(r'\s*(.*?): ', value, l)
+                new_string += new_line
+        else:
+            new_string += l
+
+    new_string = new_string.replace(' || "未知"', "")
+    new_string = re.sub(r'\s*', "", new_string)
+    new_string = new_string.replace(",]", "]")
+    return json.loads(new_string)
+
+
+def bench_parse(args):
+    rows = []
+    for entries in sorted({max(args.articles // 10, 1), args.articles}):
+        page = FakeBackend.property_page(entries=entries)
+        legacy, expected = timed(lambda: legacy_extract_cgi_data(page), args.repeat)
+        seconds, result = timed(lambda: extract_cgi_data(page), args.repeat)
+        if result != expected:
+            raise AssertionError("extract_cgi_data和原来的正则实现结果不同")
+        rows.append((f"extract_cgi_data {len(page) / 1e6:.2f}MB", seconds,
+                     f"{len(page) / 1e6 / seconds:,.1f} MB/秒 正则实现{legacy * 1000:,.1f}ms x{legacy / seconds:.1f}"))
+
+    raw = [FakeBackend.article('MzA00000000==', i) for i in range(args.articles)]
+    seconds, _ = timed(lambda: [Article(item) for item in raw], args.repeat)
+    rows.append((f"Article x{args.articles}", seconds, f"{args.articles / seconds:,.0f} 个/秒"))
+
+    raw = [FakeBackend.search_article('benchmark', i) for i in range(args.articles)]
+    seconds, _ = timed(lambda: [ArticleWithContent(item) for item in raw], args.repeat)
+    rows.append((f"ArticleWithContent x{args.articles}", seconds, f"{args.articles / seconds:,.0f} 个/秒"))
+    return rows
+
+
+def bench_export(args):
+    rows = []
+    articles = ArticleSearchResult([Article(FakeBackend.article('MzA00000000==', i)) for i in range(args.articles)], 1)
+    with tempfile.TemporaryDirectory() as directory:
+        targets = [
+            ("excel", lambda: articles.save_articles_as_excel(os.path.join(directory, "articles"))),
+            ("jsonl", lambda: articles.save_articles_as_jsonl(os.path.join(directory, "articles.jsonl"))),
+        ]
+        try:
+            import pyarrow  # noqa: F401
+            targets.append(("parquet",
+                            lambda: articles.save_articles_as_parquet(os.path.join(directory, "articles.parquet"))))
+        except ImportError:
+            pass
+        for name, func in targets:
+            seconds, _ = timed(func, args.repeat)
+            rows.append((f"{name} x{args.articles}", seconds, f"{args.articles / seconds:,.0f} 篇/秒"))
+    return rows
+
+
+def traced(func):
+    """用tracemalloc测量func返回的对象在创建过程中新分配并且仍然占用的内存，返回秒数和字节数"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return seconds, size
+
+
+def bench_memory(args):
+    def raw():
+        return (FakeBackend.article('MzA00000000==', i) for i in range(args.articles))
+
+    rows = []
+    targets = [
+        ("list[Article]", lambda: [Article(item) for item in raw()]),
+        ("ArticleTable", lambda: ArticleTable(raw())),
+    ]
+    baseline = None
+    for name, func in targets:
+        seconds, size = traced(func)
+        baseline = baseline or size
+        rows.append((f"{name} x{args.articles}", seconds, f"{size / 1e6:,.1f} MB {size / baseline:.0%}"))
+    return rows
+
+
+# 只有对应的功能才需要的依赖和标准库模块，import wechat_mp时不应该加载
+LAZY_MODULES = ("PIL", "openpyxl", "bs4", "lxml", "tqdm", "numpy", "pyarrow", "http.server", "asyncio")
+
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import wechat_mp
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [m for m in %r if m in sys.modules]}))
+''' % (LAZY_MODULES,)
+
+
+def bench_import(args):
+    """每次在新的解释器中import wechat_mp，测量冷启动的耗时并检查没有加载可选依赖"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best, loaded = None, []
+    for _ in range(max(args.repeat, 5)):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=root, check=True,
+                                stdout=subprocess.PIPE).stdout
+        result = json.loads(output.decode("utf-8").splitlines()[-1])
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        loaded = result["loaded"]
+    if args.import_budget is not None:
+        args.over_budget = best * 1000 > args.import_budget or bool(loaded)
+    return [("import wechat_mp", best, f"加载的可选依赖：{', '.join(loaded) or '无'}")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="wechat_mp离线性能测试")
+    parser.add_argument("--articles", type=int, default=2000, help="每个测试的图文数量")
+    parser.add_argument("--workers", type=int, default=8, help="并发获取的线程数")
+    parser.add_argument("--latency", type=float, default=0, help="每个请求模拟的网络延迟，秒")
+    parser.add_argument("--repeat", type=int, default=3, help="每个测试重复的次数，取最快的一次")
+    parser.add_argument("--only", choices=("pagination", "parse", "export", "memory", "import"), help="只运行一组测试")
+    parser.add_argument("--import-budget", type=float, metavar="MS",
+                        help="import wechat_mp超过MS毫秒或者加载了可选依赖时以状态码1退出")
+    parser.add_argument("--profile", metavar="FILE", help="输出各阶段耗时，并把cProfile统计保存到FILE")
+    args = parser.parse_args(argv)
+
+    logging.getLogger('wechat_mp').setLevel(logging.ERROR)
+    groups = {"pagination": bench_pagination, "parse": bench_parse, "export": bench_export, "memory": bench_memory,
+              "import": bench_import}
+    with profile(args.profile, log=False) as profiler:
+        for name, bench in groups.items():
+            if args.only and name != args.only:
+                continue
+            print(f"\n[{name}]")
+            for label, seconds, throughput in bench(args):
+                print(f"  {label:<48} {seconds * 1000:10.1f}ms  {throughput}")
+    if args.profile:
+        print(f"\n[profile]\n{profiler.report()}")
+    if getattr(args, "over_budget", False):
+        print(f"\nimport wechat_mp超出了{args.import_budget}ms的预算或者加载了可选依赖")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
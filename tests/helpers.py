@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: helpers.py
+@time: 2026/10/19 12:00
+
+测试共用的客户端、session池和注入错误的FakeBackend
+"""
+import time
+import urllib.parse
+
+import requests
+
+from wechat_mp import SessionPool, WeChat
+from wechat_mp.metrics import Metrics
+from wechat_mp.ratelimit import RateLimiter
+from wechat_mp.store import SessionStore
+from wechat_mp.testing import FakeBackend, build_response
+
+
+def fast_limiter():
+    """几乎不等待的限速器，测试中只验证重试的次数"""
+    return RateLimiter(namespace='test', rate=1e6, min_rate=1e5, max_rate=1e6, backoff=0.001)
+
+
+def make_client(backend, token=None, adapter=None):
+    """使用FakeBackend和保存的token创建一个已经登陆的客户端，adapter不为None时代替backend挂载"""
+    account = {'email': 'a@x', 'token': token or backend.token, 'verified_time': time.time()}
+    client = WeChat.from_account(account, adapter=adapter or backend)
+    client.rate_limiter = fast_limiter()
+    client.metrics = Metrics()
+    return client
+
+
+class FailingBackend(FakeBackend):
+    """match返回True的请求返回后台的错误"""
+
+    def __init__(self, match=None, **kwargs):
+        super().__init__(**kwargs)
+        self.match = match
+
+    def handle(self, method, path, params):
+        if self.match is not None and self.match(path, params):
+            return 200, {'base_resp': {'ret': -1, 'err_msg': 'system error'}}, 'application/json'
+        return super().handle(method, path, params)
+
+
+class ExpiringBackend(FakeBackend):
+    """带有expired cookie的session访问首页时拿不到token，模拟登录状态已经失效的账号"""
+
+    def send(self, request, **kwargs):
+        if 'expired' in request.headers.get('Cookie', '') and urllib.parse.urlsplit(request.url).path == '/':
+            return build_response(request, 200, '<html>请重新登录</html>', 'text/html')
+        return super().send(request, **kwargs)
+
+
+def make_pool(tmp_path, backend, expired=()):
+    """保存a@x和b@x两个账号并创建session池，expired中的账号token已经失效并且无法刷新"""
+    store = SessionStore(str(tmp_path))
+    for email in ('a@x', 'b@x'):
+        session = requests.Session()
+        token = backend.token
+        if email in expired:
+            session.cookies.set('expired', '1', domain='mp.weixin.qq.com')
+            token = 'stale'
+        store.save(email, session, token, verified_time=int(time.time()))
+    pool = SessionPool(store, adapter=backend)
+    pool.rate_limiter = fast_limiter()
+    return pool
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_analysis.py
+@time: 2026/10/19 13:30
+"""
+import math
+
+import pytest
+
+from helpers import make_client
+from wechat_mp.analysis import UserAnalysisSeries, fetch_user_analysis, top_n
+from wechat_mp.testing import FakeBackend
+
+np = pytest.importorskip('numpy')
+
+
+def series(values, email='a@x', source=0):
+    days = [{'date': f'2020-01-{i + 1:02d}', 'new_user': value, 'cancel_user': 0, 'netgain_user': value,
+             'cumulate_user': 100 + sum(values[:i + 1])} for i, value in enumerate(values)]
+    # 乱序传入，按日期排序
+    return UserAnalysisSeries.from_days(list(reversed(days)), email, source)
+
+
+def nan_list(array):
+    return [None if math.isnan(value) else value for value in array.tolist()]
+
+
+def test_from_days():
+    s = series([1, 2, 3])
+    assert len(s) == 3
+    assert s.dates.tolist() == [np.datetime64('2020-01-01'), np.datetime64('2020-01-02'),
+                                np.datetime64('2020-01-03')]
+    assert s['netgain_user'].tolist() == [1, 2, 3]
+    assert s['cumulate_user'].dtype == np.int64
+    assert s.total() == 6
+
+
+def test_rolling_and_pct_change():
+    s = series([1, 2, 3, 4])
+    assert nan_list(s.rolling_sum(window=2)) == [None, 3.0, 5.0, 7.0]
+    assert nan_list(s.rolling_mean(window=2)) == [None, 1.5, 2.5, 3.5]
+    assert nan_list(s.rolling_sum(window=5)) == [None] * 4
+    assert nan_list(s.pct_change('netgain_user', periods=2)) == [None, None, 2.0, 1.0]
+
+    zero = series([0, 5])
+    assert nan_list(zero.pct_change('netgain_user')) == [None, None]
+
+
+def test_from_batch_and_top_n():
+    backend = FakeBackend()
+    client = make_client(backend)
+    result = fetch_user_analysis(client, ('2020-01-01', '2020-01-20'), sources=[0, 1, 2])
+    batch = UserAnalysisSeries.from_batch(result)
+    assert sorted(batch['a@x']) == [0, 1, 2]
+    assert len(batch['a@x'][1]) == 20
+
+    ranked = top_n(batch, n=2)
+    assert len(ranked) == 2
+    assert ranked[0][1] >= ranked[1][1]
+    assert ranked[0][1] == max(s.total() for s in batch['a@x'].values())
+    assert top_n([series([1, 9], source=0), series([5, 1], source=1)], aggregate='last')[0][0].source == 0
+    with pytest.raises(ValueError):
+        top_n(batch, aggregate='median')
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_cache.py
+@time: 2026/10/19 12:30
+"""
+import pytest
+
+from helpers import make_client
+from wechat_mp import cache as cache_module
+from wechat_mp.cache import SQLiteCache
+from wechat_mp.testing import FakeBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可以手动前进的time.time"""
+    now = [1600000000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+    return now
+
+
+def test_ttl_per_endpoint(tmp_path, clock):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), ttls={'article list': 60}, default_ttl=10)
+    cache.set('article list', {'begin': 0}, {'base_resp': {'ret': 0}, 'page': 1})
+    cache.set('other', {'begin': 0}, {'page': 2})
+
+    clock[0] += 30
+    assert cache.get('article list', {'begin': 0}) == {'base_resp': {'ret': 0}, 'page': 1}
+    assert cache.get('other', {'begin': 0}) is None
+    assert cache.get('article list', {'begin': 5}) is None
+
+    clock[0] += 31
+    assert cache.get('article list', {'begin': 0}) is None
+    assert cache.stats == {'hits': 1, 'misses': 3}
+
+
+def test_evicts_least_recently_accessed(tmp_path, clock):
+    body = {'data': 'x' * 100}
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_size=350)
+    for begin in range(3):
+        clock[0] += 1
+        cache.set('article list', {'begin': begin}, body)
+    clock[0] += 1
+    assert cache.get('article list', {'begin': 0}) == body
+
+    clock[0] += 1
+    cache.set('article list', {'begin': 3}, body)
+    # 超过max_size后淘汰到90%以下：最久没有访问的1和2被淘汰，刚读取过的0保留
+    assert [cache.get('article list', {'begin': begin}) is not None for begin in range(4)] == \
+        [True, False, False, True]
+
+    cache.close()
+    reopened = SQLiteCache(str(tmp_path / 'cache.db'), max_size=350)
+    assert reopened.get('article list', {'begin': 3}) == body
+    reopened.clear()
+    assert reopened.get('article list', {'begin': 3}) is None
+
+
+def test_client_reuses_cached_pages(tmp_path):
+    backend = FakeBackend(articles=12)
+    client = make_client(backend)
+    client.cache = SQLiteCache(str(tmp_path / 'cache.db'))
+    account = client.search_account('x', limit=1)[0]
+    assert account.articles().total == 12
+
+    before = sum(backend.requests.values())
+    assert account.articles().total == 12
+    assert client.search_account('x', limit=1)[0].fakeid == account.fakeid
+    assert sum(backend.requests.values()) == before
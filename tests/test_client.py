@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_client.py
+@time: 2026/10/18 23:30
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+from helpers import ExpiringBackend, FailingBackend, make_client, make_pool
+from wechat_mp import AsyncWeChat, SessionPool, WeChat
+from wechat_mp.analysis import fetch_user_analysis
+from wechat_mp.exceptions import EmptySessionPool, RateLimitExceeded, UserAnalysisError
+from wechat_mp.export import ARTICLE_SCHEMA, to_record
+from wechat_mp.store import ArticleSyncStore
+from wechat_mp.testing import FakeBackend, RecordingAdapter, ReplayAdapter
+
+
+def test_import_does_not_load_asyncio():
+    script = "import sys, wechat_mp; print('asyncio' in sys.modules, wechat_mp.AsyncWeChat.__name__)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', script], cwd=root, check=True, stdout=subprocess.PIPE).stdout
+    assert output.decode('utf-8').split() == ['False', 'AsyncWeChat']
+
+
+def test_from_account_runs_init():
+    backend = FakeBackend()
+    client = make_client(backend)
+    assert client.token == backend.token
+    assert client.max_throttle_retries == 10
+    assert len(client.search_account('x', limit=3)) == 3
+
+
+def test_articles_retry_throttled_pages():
+    backend = FakeBackend(articles=30, throttle_every=3)
+    client = make_client(backend)
+    account = client.search_account('x', limit=1)[0]
+    assert account.articles(limit=23).total == 23
+    assert backend.throttled > 0
+
+
+def test_throttle_retries_are_bounded():
+    backend = FakeBackend(throttle_every=1)
+    client = make_client(backend)
+    client.max_throttle_retries = 2
+    with pytest.raises(RateLimitExceeded):
+        client.search_account('x', limit=1)
+    assert backend.throttled == 3
+
+
+def test_async_client_shares_pagination():
+    backend = FakeBackend(articles=40, throttle_every=4)
+    client = make_client(backend)
+    async_client = AsyncWeChat(client)
+
+    async def run():
+        accounts = await async_client.search_account('x', limit=2)
+        return await asyncio.gather(*[async_client.articles(account, limit=23) for account in accounts])
+
+    results = asyncio.run(run())
+    assert [result.total for result in results] == [23, 23]
+
+
+def test_login_manager_runs_in_new_event_loop(tmp_path):
+    from wechat_mp.login import FileRenderer, LoginManager
+
+    backend = FakeBackend()
+    clients = [WeChat(email, 'password', adapter=backend) for email in ('a@x', 'b@x')]
+    manager = LoginManager(clients, renderer=FileRenderer(str(tmp_path)), poll_interval=0)
+    assert manager.run() == {'a@x': True, 'b@x': True}
+    assert all(client.token == backend.token for client in clients)
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_sync_keeps_watermark_after_failed_page(tmp_path):
+    backend = FailingBackend(articles=30)
+    client = make_client(backend)
+    account = client.search_account('x', limit=1)[0]
+    store = ArticleSyncStore(str(tmp_path / 'sync.json'))
+    synced = FakeBackend.article(account.fakeid, 12)
+    store.update(account.fakeid, synced['update_time'], synced['appmsgid'])
+    watermark = store.get(account.fakeid)
+
+    backend.match = lambda path, params: path == '/cgi-bin/appmsg' and params.get('begin') == '5'
+    assert account.sync_articles(store).total == 5
+    assert store.get(account.fakeid) == watermark
+
+    backend.match = None
+    assert account.sync_articles(store).total == 12
+    assert account.sync_articles(store).total == 0
+
+
+@pytest.mark.parametrize('call', [
+    lambda client: client.get_user_analysis('2020-01-01', '2020-01-05')['list'],
+    lambda client: client.get_user_propery('2020-01-01', '2020-01-05'),
+])
+def test_stale_token_is_refreshed(call):
+    backend = FakeBackend()
+    client = make_client(backend, token='stale')
+    assert call(client)
+    assert client.token == backend.token
+
+
+def test_property_parse_error_is_not_an_invalid_session():
+    backend = FakeBackend()
+    backend.property_page = lambda entries=50: '<script>window.cgiData = {list: [{a: "\\x4"}]};</script>'
+    client = make_client(backend)
+    with pytest.raises(ValueError, match='转义'):
+        client.get_user_propery('2020-01-01', '2020-01-05')
+    assert client.metrics.snapshot().get('home', {}).get('requests', 0) == 0
+
+
+def test_concurrent_stale_token_refreshes_once():
+    from concurrent.futures import ThreadPoolExecutor
+
+    backend = FakeBackend()
+    client = make_client(backend, token='stale')
+    with ThreadPoolExecutor(16) as executor:
+        results = list(executor.map(lambda i: len(client.get_user_analysis('2020-01-01', '2020-01-05')['list']),
+                                    range(16)))
+    assert set(results) == {5}
+    assert client.metrics.snapshot()['home']['requests'] == 1
+
+
+def test_empty_pool_raises(tmp_path):
+    pool = make_pool(tmp_path, FakeBackend())
+    assert len(pool.search_account('x', limit=3)) == 3
+    for client in list(pool.clients):
+        pool.discard(client)
+    with pytest.raises(EmptySessionPool):
+        pool.search_account('x', limit=3)
+    with pytest.raises(EmptySessionPool):
+        pool.get_user_analysis('2020-01-01', '2020-01-02')
+
+
+def test_pool_rate_limiter_is_saved_next_to_sessions(tmp_path):
+    backend = FakeBackend()
+    pool = make_pool(tmp_path / 'sessions', backend)
+    pool = SessionPool(pool.session_store, adapter=backend)
+    assert pool.rate_limiter.filename == str(tmp_path / 'ratelimit.json')
+    pool.rate_limiter.throttled('article list')
+    rate = pool.rate_limiter.rate_of('article list')
+    assert SessionPool(pool.session_store, adapter=backend).rate_limiter.rate_of('article list') == rate
+
+
+def test_pool_discards_expired_member(tmp_path):
+    pool = make_pool(tmp_path, ExpiringBackend(), expired=('a@x',))
+    assert len(pool.search_account('x', limit=20)) == 20
+    assert [client.email for client in pool.clients] == ['b@x']
+    assert len(pool.search_account('x', limit=20)) == 20
+
+
+def test_pool_analysis_moves_to_next_account(tmp_path):
+    pool = make_pool(tmp_path, ExpiringBackend(), expired=('a@x',))
+    assert len(pool.get_user_analysis('2020-01-01', '2020-01-03')['list']) == 3
+    assert [client.email for client in pool.clients] == ['b@x']
+    assert pool.session_store.emails() == ['a@x', 'b@x']
+
+    pool = make_pool(tmp_path / 'expired', ExpiringBackend(), expired=('a@x', 'b@x'))
+    with pytest.raises(EmptySessionPool):
+        pool.get_user_analysis('2020-01-01', '2020-01-03')
+
+
+def test_user_analysis_reports_failed_windows():
+    backend = FailingBackend(match=lambda path, params: path == '/misc/useranalysis' and params.get('source') == '1')
+    client = make_client(backend)
+    with pytest.raises(UserAnalysisError) as info:
+        fetch_user_analysis(client, ('2020-01-01', '2020-02-15'), sources=[99999999, 1])
+    assert info.value.failures
+    assert info.value.result['a@x'][99999999]
+    with pytest.raises(UserAnalysisError):
+        client.get_user_analysis('2020-01-01', '2020-01-05', 1)
+
+
+def test_dict_record_keeps_update_time():
+    article = FakeBackend.article('fake', 0)
+    record = to_record(article, ARTICLE_SCHEMA)
+    assert record['update_time'] == article['update_time']
+    assert record['appmsgid'] == article['appmsgid']
+
+
+def test_cassette_does_not_contain_token(tmp_path, monkeypatch):
+    backend = FakeBackend(token='987654321')
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda self, request, **kwargs: backend.send(request, **kwargs))
+    cassette = str(tmp_path / 'cassette.jsonl')
+    client = make_client(backend, token='stale', adapter=RecordingAdapter(cassette))
+    assert len(client.search_account('x', limit=3)) == 3
+
+    with open(cassette, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert any('&token=0' in record['body'] for record in records)
+    assert all(backend.token not in json.dumps(record) for record in records)
+
+    replayed = make_client(backend, token='stale', adapter=ReplayAdapter(cassette))
+    assert [account.fakeid for account in replayed.search_account('x', limit=3)] == \
+        [account.fakeid for account in client.search_account('x', limit=3)]
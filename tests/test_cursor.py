@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_cursor.py
+@time: 2026/10/19 12:00
+"""
+import json
+
+import pytest
+
+from helpers import FailingBackend, make_client
+from wechat_mp.cursor import PageCursor
+from wechat_mp.testing import FakeBackend
+
+
+def test_articles_resume_from_cursor_file(tmp_path):
+    backend = FailingBackend(articles=30)
+    client = make_client(backend)
+    account = client.search_account('x', limit=1)[0]
+    filename = str(tmp_path / 'cursor.json')
+
+    backend.match = lambda path, params: path == '/cgi-bin/appmsg' and params.get('begin') == '10'
+    assert account.articles(cursor=filename).total == 10
+    with open(filename, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert (saved['begin'], saved['item_count'], saved['finished']) == (10, 10, False)
+
+    backend.match = None
+    before = sum(backend.requests.values())
+    result = account.articles(cursor=filename)
+    assert result.total == 30
+    assert [article.aid for article in result.article_list] == \
+        [FakeBackend.article(account.fakeid, i)['aid'] for i in range(30)]
+    # 只请求了剩下的4页
+    assert sum(backend.requests.values()) - before == 4
+
+    before = sum(backend.requests.values())
+    assert account.articles(cursor=filename).total == 30
+    assert sum(backend.requests.values()) == before
+
+
+def test_load_ignores_items_written_after_last_save(tmp_path):
+    filename = str(tmp_path / 'cursor.json')
+    cursor = PageCursor('article list', {'fakeid': 'f'}, 2, filename=filename)
+    cursor.total = 6
+    cursor.advance([{'i': 0}, {'i': 1}])
+    # 写入了下一页的数据，但是游标还没有保存就中断了
+    with open(filename + '.items', 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'i': 2}) + '\n')
+
+    cursor = PageCursor.load(filename)
+    assert cursor.items == [{'i': 0}, {'i': 1}]
+    assert cursor.params == {'fakeid': 'f', 'begin': 2, 'count': 2}
+
+    cursor.advance([{'i': 2}, {'i': 3}])
+    with open(filename + '.items', encoding='utf-8') as f:
+        assert [json.loads(line)['i'] for line in f] == [0, 1, 2, 3]
+    assert PageCursor.load(filename).items == cursor.items
+
+
+def test_advance_marks_finished():
+    cursor = PageCursor('article list', {}, 5, keep_items=False)
+    cursor.total = 7
+    cursor.advance([1, 2, 3, 4, 5])
+    assert (cursor.begin, cursor.finished, cursor.items) == (5, False, [])
+    # 达到数量限制只保留了一部分时只前进保留的数量，下次从没有保留的数据开始
+    cursor.advance([6], page_size=2)
+    assert (cursor.begin, cursor.fetched, cursor.finished) == (6, 6, False)
+    cursor.advance([7])
+    assert (cursor.begin, cursor.finished) == (11, True)
+
+    cursor = PageCursor('article list', {}, 5)
+    cursor.advance([])
+    assert cursor.finished
+
+
+def test_prepare_rejects_other_query(tmp_path):
+    filename = str(tmp_path / 'cursor.json')
+    cursor = PageCursor.prepare(filename, 'article list', {'fakeid': 'a'}, 5)
+    cursor.advance([{'i': 0}])
+    assert PageCursor.prepare(filename, 'article list', {'fakeid': 'a'}, 5).fetched == 1
+    with pytest.raises(ValueError):
+        PageCursor.prepare(filename, 'article list', {'fakeid': 'b'}, 5)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_export.py
+@time: 2026/10/19 11:00
+"""
+import json
+
+import pytest
+
+from wechat_mp.exceptions import ArticlesNotObtainError
+from wechat_mp.export import (ARTICLE_SCHEMA, USER_ANALYSIS_SCHEMA, ArrowWriter, save_articles_as_excel,
+                              save_articles_as_jsonl, save_articles_as_parquet, save_user_analysis)
+from wechat_mp.models import Article, ArticleSearchResult, ArticleWithContent
+from wechat_mp.testing import FakeBackend
+
+
+def articles(count, fakeid='MzA00000000=='):
+    return [Article(FakeBackend.article(fakeid, i)) for i in range(count)]
+
+
+def analysis_result():
+    return [{'user_source': source, 'list': FakeBackend.user_analysis('2020-01-01', '2020-01-03', source)
+             ['category_list'][0]['list']} for source in (0, 1)]
+
+
+def read_jsonl(filename):
+    with open(filename, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_jsonl_articles_and_dicts(tmp_path):
+    raw = [FakeBackend.article('MzA00000000==', i) for i in range(3)]
+    filename = str(tmp_path / 'articles.jsonl')
+    ArticleSearchResult(articles(3), 1).save_articles_as_jsonl(filename)
+    from_objects = read_jsonl(filename)
+    assert from_objects[0] == {name: raw[0][name] for name, _, _ in ARTICLE_SCHEMA}
+
+    # 字典和生成器按字段名读取，结果与模型对象相同
+    assert save_articles_as_jsonl((item for item in raw), filename, type=1) == 3
+    assert read_jsonl(filename) == from_objects
+
+
+def test_jsonl_user_analysis(tmp_path):
+    filename = str(tmp_path / 'analysis.jsonl')
+    assert save_user_analysis(analysis_result(), filename) == 6
+    records = read_jsonl(filename)
+    assert list(records[0]) == [name for name, _, _ in USER_ANALYSIS_SCHEMA]
+    assert [(record['user_source'], record['date']) for record in records[:4]] == [
+        (0, '2020-01-01'), (0, '2020-01-02'), (0, '2020-01-03'), (1, '2020-01-01')]
+
+
+def test_excel_columns(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    assert save_articles_as_excel(articles(3), str(tmp_path / 'history')) == 3
+    rows = list(openpyxl.load_workbook(str(tmp_path / 'history.xlsx')).active.values)
+    assert rows[0] == ('标题', '摘要', '链接', '更新时间', 'aid', 'appmsgid', '图文序号')
+    assert len(rows) == 4
+    assert rows[1][0] == articles(1)[0].title
+
+    searched = [ArticleWithContent(FakeBackend.search_article('python', i)) for i in range(2)]
+    ArticleSearchResult(searched, 0).save_articles_as_excel(str(tmp_path / 'search.xlsx'))
+    rows = list(openpyxl.load_workbook(str(tmp_path / 'search.xlsx')).active.values)
+    assert '正文' not in rows[0]
+    ArticleSearchResult(searched, 0).save_articles_as_excel(str(tmp_path / 'content.xlsx'), include_content=True)
+    rows = list(openpyxl.load_workbook(str(tmp_path / 'content.xlsx')).active.values)
+    assert rows[1][rows[0].index('正文')] == searched[0].content
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_arrow_formats(tmp_path, format):
+    pyarrow = pytest.importorskip('pyarrow')
+    filename = str(tmp_path / f'articles.{format}')
+    assert save_articles_as_parquet(articles(7), filename, format=format, batch_size=3) == 7
+    if format == 'parquet':
+        import pyarrow.parquet
+        table = pyarrow.parquet.read_table(filename)
+    else:
+        import pyarrow.ipc
+        table = pyarrow.ipc.open_file(filename).read_all()
+    assert table.num_rows == 7
+    assert table.schema.field('update_time').type == pyarrow.int64()
+    assert table.column('aid').to_pylist() == [article.aid for article in articles(7)]
+
+
+def test_arrow_user_analysis_and_bad_format(tmp_path):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    filename = str(tmp_path / 'analysis.parquet')
+    assert save_user_analysis(analysis_result(), filename, format='parquet', batch_size=4) == 6
+    assert pyarrow.parquet.read_table(filename).column('netgain_user').to_pylist() == \
+        [day['netgain_user'] for category in analysis_result() for day in category['list']]
+    with pytest.raises(ValueError):
+        ArrowWriter(str(tmp_path / 'x'), ARTICLE_SCHEMA, format='csv')
+
+
+def test_excel_empty_search_result_creates_no_workbook(tmp_path):
+    from openpyxl.worksheet._writer import ALL_TEMP_FILES
+
+    with pytest.raises(ArticlesNotObtainError):
+        ArticleSearchResult([], 0).save_articles_as_excel(str(tmp_path / 'empty'))
+    assert list(tmp_path.iterdir()) == []
+    assert not ALL_TEMP_FILES
+
+
+def test_excel_failed_generator_removes_temp_file(tmp_path):
+    from openpyxl.worksheet._writer import ALL_TEMP_FILES
+
+    def generate():
+        yield from articles(5)
+        raise RuntimeError('获取失败')
+
+    with pytest.raises(RuntimeError):
+        save_articles_as_excel(generate(), str(tmp_path / 'failed'))
+    assert list(tmp_path.iterdir()) == []
+    assert not ALL_TEMP_FILES
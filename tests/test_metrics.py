@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_metrics.py
+@time: 2026/10/19 14:00
+"""
+from helpers import make_client
+from wechat_mp.metrics import Metrics
+from wechat_mp.testing import FakeBackend
+
+
+def test_render_prometheus_text():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.observe('article list', 0.05, 200, 100)
+    metrics.observe('article list', 0.5, 200, 50)
+    metrics.ret('article list', 0)
+    metrics.ret('article list', 200013)
+    metrics.error('home', ConnectionError())
+    metrics.observe('search "x"', 2, 500, 0)
+
+    lines = metrics.render().splitlines()
+    assert 'wechat_mp_requests_total{endpoint="article list",status="200"} 2' in lines
+    assert 'wechat_mp_request_errors_total{endpoint="home",error="ConnectionError"} 1' in lines
+    assert 'wechat_mp_response_bytes_total{endpoint="article list"} 150' in lines
+    assert 'wechat_mp_ret_total{endpoint="article list",ret="200013"} 1' in lines
+    assert 'wechat_mp_throttled_total{endpoint="article list"} 1' in lines
+    assert [line for line in lines if line.startswith('wechat_mp_request_duration_seconds_bucket'
+                                                      '{endpoint="article list"')] == [
+        'wechat_mp_request_duration_seconds_bucket{endpoint="article list",le="0.1"} 1',
+        'wechat_mp_request_duration_seconds_bucket{endpoint="article list",le="1"} 2',
+        'wechat_mp_request_duration_seconds_bucket{endpoint="article list",le="+Inf"} 2',
+    ]
+    assert 'wechat_mp_request_duration_seconds_count{endpoint="article list"} 2' in lines
+    # 标签中的引号需要转义
+    assert 'wechat_mp_requests_total{endpoint="search \\"x\\"",status="500"} 1' in lines
+    # 每个指标都有HELP和TYPE
+    assert sum(line.startswith('# TYPE') for line in lines) == 6
+
+    metrics.clear()
+    assert 'wechat_mp_requests_total{' not in metrics.render()
+
+
+def test_client_records_requests():
+    backend = FakeBackend(articles=12, throttle_every=2)
+    client = make_client(backend)
+    account = client.search_account('x', limit=1)[0]
+    account.articles()
+
+    snapshot = client.metrics.snapshot()
+    assert snapshot['article list']['requests'] == sum(
+        count for endpoint, count in backend.requests.items() if endpoint.startswith('/cgi-bin/appmsg'))
+    assert snapshot['article list']['throttled'] == backend.throttled
+    assert snapshot['article list']['rets'][0] == 3
+    assert snapshot['search account']['bytes'] > 0
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_models.py
+@time: 2026/10/19 10:00
+"""
+import pytest
+
+from wechat_mp.models import Article, ArticleSearchResult, ArticleTable, StringColumn
+from wechat_mp.testing import FakeBackend
+
+
+def test_string_column_round_trip():
+    column = StringColumn()
+    for value in ('图文标题', None, '', 'http://mp.weixin.qq.com/s?a=1'):
+        column.append(value)
+    assert [column[i] for i in range(len(column))] == ['图文标题', None, '', 'http://mp.weixin.qq.com/s?a=1']
+    assert column[-1] == 'http://mp.weixin.qq.com/s?a=1'
+    with pytest.raises(IndexError):
+        column[4]
+
+
+def test_article_table_matches_articles():
+    raw = [FakeBackend.article('MzA00000000==', i) for i in range(10)]
+    raw[3] = dict(raw[3], aid='custom', digest=None)
+    articles = [Article(item) for item in raw]
+    table = ArticleSearchResult(list(articles), 1).compact().article_list
+    assert isinstance(table, ArticleTable)
+    assert len(table) == 10
+    assert table.row(3)['aid'] == 'custom'
+    assert table.row(3)['digest'] is None
+    for expected, actual in zip(articles, table):
+        assert [getattr(actual, name) for name in Article.__slots__] == \
+            [getattr(expected, name) for name in Article.__slots__]
+    assert [article.title for article in table[-2:]] == [raw[8]['title'], raw[9]['title']]
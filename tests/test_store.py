@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_store.py
+@time: 2026/10/19 13:00
+"""
+import datetime
+import pickle
+
+import requests
+
+from helpers import make_client
+from wechat_mp import WeChat
+from wechat_mp.store import AnalysisStore, SessionStore
+from wechat_mp.testing import FakeBackend
+
+
+def logged_in_session():
+    session = requests.Session()
+    session.headers['X-Test'] = '1'
+    session.cookies.set('slave_sid', 'abc', domain='mp.weixin.qq.com', path='/')
+    return session
+
+
+def test_session_store_round_trip(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.save('a+b@x.com', logged_in_session(), '123', verified_time=100)
+    assert store.emails() == ['a+b@x.com']
+    assert 'a+b@x.com' in store
+
+    record = store.load('a+b@x.com')
+    assert (record['token'], record['verified_time']) == ('123', 100)
+    session = SessionStore.restore_session(record)
+    assert session.headers['X-Test'] == '1'
+    assert session.cookies.get('slave_sid', domain='mp.weixin.qq.com') == 'abc'
+
+    store.update('a+b@x.com', verified_time=200)
+    assert store.load('a+b@x.com')['verified_time'] == 200
+    store.delete('a+b@x.com')
+    assert store.load('a+b@x.com') is None
+    assert store.emails() == []
+
+
+def test_import_pickle(tmp_path):
+    filename = str(tmp_path / 'sessions.pkl')
+    with open(filename, 'wb') as f:
+        pickle.dump({'a@x': {'session': logged_in_session(), 'token': '111'},
+                     'b@x': {'session': None, 'token': '222'}}, f)
+
+    store = SessionStore(str(tmp_path / 'sessions'))
+    assert store.import_pickle(str(tmp_path / 'missing.pkl')) == 0
+    assert store.import_pickle(filename) == 1
+    assert store.emails() == ['a@x']
+    assert store.load('a@x')['token'] == '111'
+
+
+def test_client_restores_saved_session(tmp_path):
+    backend = FakeBackend()
+    store = SessionStore(str(tmp_path))
+    store.save('a@x', requests.Session(), 'stale', verified_time=0)
+
+    client = WeChat('a@x', None, session_store=store, adapter=backend)
+    assert client.login().token == backend.token
+    # 重新验证后的token写回了文件
+    assert store.load('a@x')['token'] == backend.token
+    assert store.load('a@x')['verified_time'] > 0
+
+
+def day(date, value=1):
+    return {'date': date, 'new_user': value, 'cancel_user': 0, 'netgain_user': value, 'cumulate_user': value}
+
+
+def test_missing_ranges(tmp_path):
+    store = AnalysisStore(str(tmp_path / 'analysis.db'))
+    store.put_days('a@x', 0, [day('2020-01-02'), day('2020-01-03'), day('2020-01-06')])
+    assert store.missing_ranges('a@x', 0, '2020-01-01', '2020-01-08') == [
+        ('2020-01-01', '2020-01-01'), ('2020-01-04', '2020-01-05'), ('2020-01-07', '2020-01-08')]
+    assert store.missing_ranges('a@x', 0, '2020-01-02', '2020-01-03') == []
+    assert store.missing_ranges('a@x', 1, '2020-01-02', '2020-01-03') == [('2020-01-02', '2020-01-03')]
+    assert store.missing_ranges('b@x', 0, '2020-01-02', '2020-01-02') == [('2020-01-02', '2020-01-02')]
+
+
+def test_missing_ranges_refetches_recent_days(tmp_path):
+    store = AnalysisStore(str(tmp_path / 'analysis.db'), mutable_days=2)
+    today = datetime.date.today()
+    dates = [(today - datetime.timedelta(days=n)).isoformat() for n in (3, 2, 1, 0)]
+    store.put_days('a@x', 0, [day(date) for date in dates])
+    assert store.missing_ranges('a@x', 0, dates[0], dates[-1]) == [(dates[2], dates[3])]
+
+
+def test_client_reads_stored_days(tmp_path):
+    backend = FakeBackend()
+    client = make_client(backend)
+    client.analysis_store = AnalysisStore(str(tmp_path / 'analysis.db'))
+    first = client.get_user_analysis('2020-01-01', '2020-01-10')
+    before = sum(backend.requests.values())
+    assert client.get_user_analysis('2020-01-03', '2020-01-05')['list'] == first['list'][2:5]
+    assert sum(backend.requests.values()) == before
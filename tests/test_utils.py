@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: test_utils.py
+@time: 2026/10/19 10:30
+"""
+import math
+
+import pytest
+
+from wechat_mp.testing import FakeBackend
+from wechat_mp.utils import extract_cgi_data, parse_js_object
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('{a: 1, "b": 2, \'c\': 3,}', {'a': 1, 'b': 2, 'c': 3}),
+    ('[1, -2, 1.5, .5, 1e3, 0x1F,]', [1, -2, 1.5, 0.5, 1000.0, 31]),
+    ('{a: true, b: false, c: null, d: undefined}', {'a': True, 'b': False, 'c': None, 'd': None}),
+    ('{a: /* 注释 */ 1, // 行注释\n b: 2}', {'a': 1, 'b': 2}),
+    ('{count: +("123") || 0, empty: +("") || 0, name: "" || "未知", keep: "男" || "未知"}',
+     {'count': 123, 'empty': 0, 'name': '未知', 'keep': '男'}),
+    ('{a: 1 && 2, b: 0 && 2, c: !0, d: !{}}', {'a': 2, 'b': 0, 'c': True, 'd': False}),
+    ('{a: (1), b: [{c: []}]}', {'a': 1, 'b': [{'c': []}]}),
+])
+def test_parse_js_object(text, expected):
+    assert parse_js_object(text)[0] == expected
+
+
+@pytest.mark.parametrize('literal, expected', [
+    ('"x\\\'y"', "x'y"),
+    ("'x\\'y'", "x'y"),
+    ("'say \"hi\"'", 'say "hi"'),
+    ('"\\x41\\u0042\\u{43}"', 'ABC'),
+    ('"\\n\\t\\r\\b\\f\\v\\0"', '\n\t\r\b\f\v\0'),
+    ('"\\/\\\\\\"\\q"', '/\\"q'),
+    ('"\\uD83D\\uDE00"', '\U0001F600'),
+    ('"a\\\nb"', 'ab'),
+    ('"中文"', '中文'),
+])
+def test_js_string_escapes(literal, expected):
+    assert parse_js_object('{a: ' + literal + '}')[0] == {'a': expected}
+
+
+def test_nan_and_infinity():
+    value = parse_js_object('[NaN, Infinity, +("x")]')[0]
+    assert math.isnan(value[0]) and value[1] == math.inf and math.isnan(value[2])
+
+
+@pytest.mark.parametrize('text', ['{a: "\\x4"}', '{a: "\\u12"}', '{a 1}', '{a: }', '{a: [1, 2}'])
+def test_parse_errors(text):
+    with pytest.raises(ValueError):
+        parse_js_object(text)
+
+
+def test_parse_js_object_returns_end():
+    text = 'window.x = {a: 1}; var y = 2;'
+    value, end = parse_js_object(text, text.index('{'))
+    assert value == {'a': 1}
+    assert text[end:] == '; var y = 2;'
+
+
+def test_extract_cgi_data():
+    data = extract_cgi_data(FakeBackend.property_page(entries=3))
+    assert data['list'][0]['genders'] == [{'name': f'genders{i}', 'count': i * 7} for i in range(3)]
+    with pytest.raises(ValueError):
+        extract_cgi_data('<html>登录</html>')
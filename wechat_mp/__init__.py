@@ -7,8 +7,37 @@
 @file: __init__.py.py
 @time: 2018/9/8 11:16
 """
+import logging
+
+# 库本身不配置日志的输出，由使用者调用logging.basicConfig等方法配置
+logging.getLogger('wechat_mp').addHandler(logging.NullHandler())
 
 from . import exceptions
 from . import models
 from . import utils
 from .client import WeChat
+from .pool import SessionPool
+from .profiling import Profiler, profile
+from .transport import Transport
+
+# 依赖asyncio的类在第一次访问时才导入，只使用同步客户端时不加载asyncio
+_LAZY_ATTRIBUTES = {
+    'AsyncWeChat': '.aio',
+    'SessionKeeper': '.keepalive',
+    'LoginManager': '.login',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
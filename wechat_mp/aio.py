@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: aio.py
+@time: 2026/10/18 10:00
+"""
+import asyncio
+import functools
+import logging
+
+from wechat_mp.cursor import PageCursor
+from wechat_mp.models import OfficalAccount, Article, ArticleWithContent, ArticleSearchResult
+from wechat_mp.profiling import phase, record
+
+logger = logging.getLogger('wechat_mp')
+
+
+class AsyncWeChat:
+    """
+    基于asyncio的API操作程序，与 :class:`WeChat <wechat_mp.client.WeChat>` 共享登陆状态和session
+
+    分页请求在线程池中执行，页与页之间按照client的限速器使用 ``asyncio.sleep`` 等待，
+    因此同一个事件循环可以同时交错地获取多个公众号的分页数据。
+
+    :param client: 已经登陆的WeChat对象，也可以是 :class:`SessionPool <wechat_mp.pool.SessionPool>`
+    :type client: :class:`WeChat <wechat_mp.client.WeChat>`
+    :param executor: 执行阻塞请求的线程池，默认使用事件循环的默认线程池
+    """
+
+    def __init__(self, client, executor=None):
+        self.client = client
+        self._executor = executor
+
+    async def _run(self, func, *args, **kwargs):
+        """在线程池中执行阻塞的请求"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _request_page(self, path, params, interval=None):
+        """
+        按照client的请求步骤(缓存、限速器和频率限制重试)请求一页搜索结果，
+        等待使用非阻塞的 ``asyncio.sleep``，请求在线程池中执行
+
+        :param path: api_collections中search分类下的API名称
+        :param params: 分页参数
+        :param interval: 固定的请求时间间隔，秒。为None时使用限速器学习到的速率
+        :return: 响应字典
+        """
+        steps = self.client._page_steps(path, params, interval)
+        try:
+            wait = next(steps)
+            while True:
+                record('sleep', wait)
+                await asyncio.sleep(wait)
+                response = await self._run(self.client._send_page, path, dict(params))
+                wait = steps.send(response)
+        except StopIteration as e:
+            return e.value
+
+    async def _paginate(self, cursor, limit, interval):
+        """
+        从游标的位置开始不断地请求下一页，直到达到数量限制或者没有更多数据
+
+        :param cursor: 分页游标
+        :param limit: 最多获取的数量，0表示不限制
+        :param interval: 固定的请求时间间隔，秒
+        :return: 游标中的字典列表
+        """
+        while not cursor.finished and (not limit or cursor.fetched < limit):
+            response = await self._request_page(cursor.endpoint, cursor.params, interval)
+            if self.client._accept_page(cursor, response, limit) is None:
+                break
+        return cursor.items
+
+    async def search_account(self, name_or_id, limit=0, interval=None, cursor=None):
+        """
+        根据公众号名称或者ID查询公众号列表
+
+        :param name_or_id: 公众号的名称或者微信ID/原始ID
+        :type name_or_id: str
+        :param limit: 获取多少条查询记录
+        :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return:  :class:`OfficalAccount <wechat_mp.models.OfficalAccount>` 对象列表
+        """
+        cursor = PageCursor.prepare(cursor, 'search account', {'query': name_or_id}, 5)
+        accounts = await self._paginate(cursor, limit, interval)
+        with phase('model'):
+            return [OfficalAccount(account, self.client) for account in accounts]
+
+    async def articles(self, account, title_contain="", limit=0, interval=None, cursor=None):
+        """
+        获取公众号的历史群发图文
+
+        :param account: 公众号对象
+        :type account: :class:`OfficalAccount <wechat_mp.models.OfficalAccount>`
+        :param title_contain: 图文标题包含的字符串
+        :type title_contain: str
+        :param limit: 限制获取的图文数量
+        :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return: :class:`ArticleSearchResult <wechat_mp.models.ArticleSearchResult>` 对象
+        """
+        cursor = PageCursor.prepare(cursor, 'article list', {'query': title_contain, 'fakeid': account.fakeid}, 5)
+        article_list = await self._paginate(cursor, limit, interval)
+        with phase('model'):
+            return ArticleSearchResult([Article(article) for article in article_list], type=1)
+
+    async def search_article(self, keyword, limit=0, interval=None, cursor=None):
+        """
+        根据关键词搜索原创文章
+
+        :param keyword: 包含关键词的标题
+        :param limit:设置获取多少篇文章
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return: :class:`ArticleSearchResult <wechat_mp.models.ArticleSearchResult>` 对象
+        """
+        cursor = PageCursor.prepare(cursor, 'search article', {"url": keyword, "allow_reprint": 0}, 20)
+        article_list = await self._paginate(cursor, limit, interval)
+        with phase('model'):
+            return ArticleSearchResult([ArticleWithContent(article) for article in article_list], type=0)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.client.email}>"
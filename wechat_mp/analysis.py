@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: analysis.py
+@time: 2026/10/18 19:00
+"""
+import datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from wechat_mp.exceptions import UserAnalysisError
+
+logger = logging.getLogger('wechat_mp')
+
+# 用户分析的渠道值和名称
+USER_SOURCES = {
+    99999999: "全部渠道",
+    1: "搜一搜",
+    30: "扫描二维码",
+    43: "图文页右上角菜单",
+    57: "图文页内公众号名称",
+    17: "名片分享",
+    51: "支付后关注",
+    0: "其他合计",
+}
+
+# 后台一次最多查询的天数
+MAX_WINDOW_DAYS = 30
+
+
+def _to_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def split_date_range(start_date, end_date, window=MAX_WINDOW_DAYS):
+    """
+    把日期范围切分成不超过window天的窗口
+
+    :param start_date: 开始日期 格式2020-02-25
+    :param end_date: 截止日期 格式2020-02-25
+    :param window: 每个窗口的最多天数
+    :return: (开始日期, 截止日期)字符串元组的列表
+    """
+    start, end = _to_date(start_date), _to_date(end_date)
+    if start > end:
+        raise ValueError(f"开始日期 {start} 晚于截止日期 {end}")
+    windows = []
+    while start <= end:
+        window_end = min(end, start + datetime.timedelta(days=window - 1))
+        windows.append((start.isoformat(), window_end.isoformat()))
+        start = window_end + datetime.timedelta(days=1)
+    return windows
+
+
+def _normalize_ranges(date_ranges):
+    """date_ranges可以是一个(开始日期, 截止日期)，也可以是它们的列表，日期统一转换成字符串"""
+    if len(date_ranges) == 2 and all(isinstance(d, (str, datetime.date)) for d in date_ranges):
+        date_ranges = [date_ranges]
+    return [(_to_date(start).isoformat(), _to_date(end).isoformat()) for start, end in date_ranges]
+
+
+def _plan(client, source, date_ranges, window):
+    """
+    一个账号、一个渠道需要请求的窗口和已经保存的每日数据。
+    账号设置了analysis_store时只请求没有保存的日期和最近仍然可能变化的日期
+
+    :return: (窗口列表, 日期到每日数据的字典)
+    """
+    store = getattr(client, 'analysis_store', None)
+    windows = set()
+    stored = {}
+    for start, end in date_ranges:
+        if store is None:
+            missing = [(start, end)]
+        else:
+            missing = store.missing_ranges(client.email, source, start, end)
+            stored.update(store.get_days(client.email, source, start, end))
+        for missing_start, missing_end in missing:
+            windows.update(split_date_range(missing_start, missing_end, window))
+    return sorted(windows), stored
+
+
+def _fetch_window(client, start_date, end_date, source, interval):
+    """请求一个账号、一个渠道、一个窗口的每日数据，请求失败时抛出UserAnalysisError"""
+    response = client._request_analysis(start_date, end_date, source, interval)
+    base_resp = response.get('base_resp', {})
+    if base_resp.get('ret') != 0:
+        raise UserAnalysisError(f"账号 {client.email} 渠道 {source} {start_date}至{end_date} 的用户分析请求失败：{base_resp}",
+                                [(client.email, source, start_date, end_date, base_resp)])
+    days = []
+    for category in response.get('category_list') or []:
+        if category.get('user_source', source) == source:
+            days.extend(category.get('list') or [])
+    return days
+
+
+def fetch_user_analysis(clients, date_ranges, sources=None, window=MAX_WINDOW_DAYS, workers=8, interval=None):
+    """
+    批量获取多个账号、多个渠道、多个日期范围的用户分析数据
+
+    每个日期范围按window切分成后台允许的窗口，所有(账号, 渠道, 窗口)组合放进线程池并发请求，
+    每个请求都经过对应账号的限速器。同一个账号、渠道的结果按日期合并成一个时间序列，重复的日期只保留一次。
+    账号设置了 :class:`AnalysisStore <wechat_mp.store.AnalysisStore>` 时，已经保存的过去日期不再请求，
+    请求到的数据也会保存下来
+
+    有请求失败时，其他请求仍然完成并保存，最后抛出 :class:`UserAnalysisError <wechat_mp.exceptions.UserAnalysisError>`，
+    它的failures是失败的(邮箱, 渠道值, 开始日期, 截止日期, base_resp)列表，result是其他请求成功的数据
+
+    :param clients: WeChat对象的列表，也可以是单个WeChat对象
+    :param date_ranges: (开始日期, 截止日期)或者它们的列表，日期格式2020-02-25
+    :param sources: 渠道值列表，默认为 ``USER_SOURCES`` 中的所有渠道
+    :param window: 每次请求最多的天数
+    :param workers: 并发请求的线程数
+    :param interval: 固定的请求时间间隔，秒。为None时使用限速器学习到的速率
+    :return: {邮箱: {渠道值: 按日期排序的每日数据列表}}
+    """
+    if not isinstance(clients, (list, tuple)):
+        clients = [clients]
+    sources = list(USER_SOURCES) if sources is None else list(sources)
+    date_ranges = _normalize_ranges(date_ranges)
+
+    merged = {}
+    tasks = []
+    failures = []
+    for client in clients:
+        for source in sources:
+            windows, stored = _plan(client, source, date_ranges, window)
+            merged.setdefault(client.email, {})[source] = stored
+            tasks.extend((client, source, start, end) for start, end in windows)
+    logger.info("%s个账号、%s个渠道，共%s次请求", len(clients), len(sources), len(tasks))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fetch_window, client, start, end, source, interval)
+                   for client, source, start, end in tasks]
+        for (client, source, _, _), future in zip(tasks, futures):
+            try:
+                days = future.result()
+            except UserAnalysisError as e:
+                logger.warning("%s", e)
+                failures.extend(e.failures)
+                continue
+            store = getattr(client, 'analysis_store', None)
+            if store is not None and days:
+                store.put_days(client.email, source, days)
+            series = merged[client.email][source]
+            for day in days:
+                series[day['date']] = day
+
+    result = {email: {source: [series[date] for date in sorted(series)] for source, series in by_source.items()}
+              for email, by_source in merged.items()}
+    if failures:
+        raise UserAnalysisError(f"{len(tasks)}次用户分析请求中{len(failures)}次失败", failures, result)
+    return result
+
+
+# 用户分析每日数据中的数值字段
+USER_ANALYSIS_FIELDS = ("new_user", "cancel_user", "netgain_user", "cumulate_user")
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("UserAnalysisSeries需要安装numpy: pip install numpy")
+    return numpy
+
+
+class UserAnalysisSeries:
+    """
+    一个账号、一个渠道的用户分析时间序列，日期和每个字段都保存为NumPy数组，
+    滚动平均、环比等计算都是向量化的。需要安装numpy
+
+    :param dates: datetime64[D]数组
+    :param columns: 字段名到int64数组的字典
+    :param email: 账号邮箱
+    :param source: 渠道值
+    """
+
+    __slots__ = ('dates', 'columns', 'email', 'source')
+
+    def __init__(self, dates, columns, email=None, source=None):
+        self.dates = dates
+        self.columns = columns
+        self.email = email
+        self.source = source
+
+    @classmethod
+    def from_days(cls, days, email=None, source=None):
+        """
+        使用每日数据列表创建时间序列
+
+        :param days: ``get_user_analysis`` 结果中的list，或者 ``fetch_user_analysis`` 结果中的每日数据列表
+        :param email: 账号邮箱
+        :param source: 渠道值
+        :return: :class:`UserAnalysisSeries <wechat_mp.analysis.UserAnalysisSeries>` 对象
+        """
+        np = _numpy()
+        days = sorted(days, key=lambda day: day['date'])
+        dates = np.array([day['date'] for day in days], dtype='datetime64[D]')
+        columns = {field: np.fromiter((day.get(field) or 0 for day in days), dtype=np.int64, count=len(days))
+                   for field in USER_ANALYSIS_FIELDS}
+        return cls(dates, columns, email, source)
+
+    @classmethod
+    def from_batch(cls, result):
+        """
+        把 ``fetch_user_analysis`` 的结果转换成时间序列
+
+        :param result: {邮箱: {渠道值: 每日数据列表}}
+        :return: {邮箱: {渠道值: UserAnalysisSeries}}
+        """
+        return {email: {source: cls.from_days(days, email, source) for source, days in by_source.items()}
+                for email, by_source in result.items()}
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def total(self, field="netgain_user"):
+        """字段的合计"""
+        return int(self.columns[field].sum())
+
+    def rolling_sum(self, field="netgain_user", window=7):
+        """
+        滚动合计，前window-1天不足一个窗口，结果为NaN
+
+        :param field: 字段名
+        :param window: 窗口天数
+        :return: 与日期等长的float64数组
+        """
+        np = _numpy()
+        values = self.columns[field].astype(np.float64)
+        result = np.full(len(values), np.nan)
+        if window <= len(values):
+            cumsum = np.cumsum(np.concatenate(([0.0], values)))
+            result[window - 1:] = cumsum[window:] - cumsum[:-window]
+        return result
+
+    def rolling_mean(self, field="netgain_user", window=7):
+        """
+        滚动平均，前window-1天不足一个窗口，结果为NaN
+
+        :param field: 字段名
+        :param window: 窗口天数
+        :return: 与日期等长的float64数组
+        """
+        return self.rolling_sum(field, window) / window
+
+    def pct_change(self, field="cumulate_user", periods=1):
+        """
+        与periods天前相比的变化率，例如periods=7为周环比。前periods天和基数为0时结果为NaN
+
+        :param field: 字段名
+        :param periods: 间隔天数
+        :return: 与日期等长的float64数组
+        """
+        np = _numpy()
+        values = self.columns[field].astype(np.float64)
+        result = np.full(len(values), np.nan)
+        if periods < len(values):
+            previous = values[:-periods]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                change = (values[periods:] - previous) / previous
+            change[previous == 0] = np.nan
+            result[periods:] = change
+        return result
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.email} {self.source} {len(self)}天>"
+
+
+def top_n(series, field="netgain_user", n=10, aggregate="sum"):
+    """
+    按字段的合计、平均或者最后一天的值给多个时间序列排名
+
+    :param series: UserAnalysisSeries的列表，或者 ``UserAnalysisSeries.from_batch`` 的结果
+    :param field: 字段名
+    :param n: 返回的数量
+    :param aggregate: sum、mean或者last
+    :return: (UserAnalysisSeries, 值)按值从大到小排列的列表
+    """
+    np = _numpy()
+    if isinstance(series, dict):
+        series = [s for by_source in series.values() for s in by_source.values()]
+    series = [s for s in series if len(s)]
+    if aggregate == "sum":
+        values = np.array([s.columns[field].sum() for s in series], dtype=np.float64)
+    elif aggregate == "mean":
+        values = np.array([s.columns[field].mean() for s in series], dtype=np.float64)
+    elif aggregate == "last":
+        values = np.array([s.columns[field][-1] for s in series], dtype=np.float64)
+    else:
+        raise ValueError(f"不支持的聚合方式：{aggregate}")
+    order = np.argsort(-values, kind='stable')[:n]
+    return [(series[i], values[i].item()) for i in order]
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: cache.py
+@time: 2026/10/18 14:00
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('wechat_mp')
+
+# 各个分页API的默认缓存秒数
+DEFAULT_TTLS = {
+    'search account': 3600,
+    'article list': 600,
+    'search article': 600,
+}
+
+
+class ResponseCache:
+    """
+    分页响应缓存的基类，按照API名称、查询条件、起始位置和fakeid缓存响应字典
+
+    子类只需要实现 ``_get``、``_set`` 和 ``clear``
+
+    :param ttls: 每个API的缓存秒数，没有设置的API使用default_ttl
+    :param default_ttl: 默认的缓存秒数
+    """
+
+    def __init__(self, ttls=None, default_ttl=600):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint, params):
+        """
+        生成缓存的键
+
+        :param endpoint: API名称
+        :param params: 分页参数，包含查询条件、begin、count和fakeid
+        :return: 缓存的键
+        """
+        raw = json.dumps([endpoint, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, endpoint, params):
+        """
+        读取没有过期的响应
+
+        :param endpoint: API名称
+        :param params: 分页参数
+        :return: 响应字典，没有缓存时返回None
+        """
+        ttl = self.ttls.get(endpoint, self.default_ttl)
+        response = self._get(self.make_key(endpoint, params), time.time() - ttl)
+        if response is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response
+
+    def set(self, endpoint, params, response):
+        """
+        缓存一页响应
+
+        :param endpoint: API名称
+        :param params: 分页参数
+        :param response: 响应字典
+        """
+        self._set(self.make_key(endpoint, params), endpoint, response)
+
+    @property
+    def stats(self):
+        """命中和未命中的次数"""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _get(self, key, min_created_at):
+        raise NotImplementedError
+
+    def _set(self, key, endpoint, response):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: hits={self.hits} misses={self.misses}>"
+
+
+class SQLiteCache(ResponseCache):
+    """
+    保存在SQLite文件中的分页响应缓存，总大小超过max_size时按最近访问时间淘汰
+
+    :param filename: SQLite文件名
+    :param max_size: 缓存的最大字节数
+    :param ttls: 每个API的缓存秒数
+    :param default_ttl: 默认的缓存秒数
+    """
+
+    def __init__(self, filename="./wechat_mp_cache.sqlite3", max_size=200 * 1024 * 1024, ttls=None, default_ttl=600):
+        super().__init__(ttls, default_ttl)
+        self.filename = filename
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, endpoint TEXT, created_at REAL, accessed_at REAL, size INTEGER, body TEXT)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _get(self, key, min_created_at):
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE key = ? AND created_at >= ?",
+                                     (key, min_created_at)).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def _set(self, key, endpoint, response):
+        body = json.dumps(response, ensure_ascii=False)
+        size = len(body.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._size -= old[0]
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                               (key, endpoint, now, now, size, body))
+            self._size += size
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """淘汰最久没有访问的响应，直到总大小降到max_size的90%"""
+        target = self.max_size * 0.9
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at")
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.info("缓存超过%s字节，淘汰了%s页响应", self.max_size, len(evicted))
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+
+    def close(self):
+        """关闭SQLite连接"""
+        self._conn.close()
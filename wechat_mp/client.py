@@ -8,69 +8,152 @@
 @time: 2018/9/8 11:16
 """
 import json
-import os
-import pickle
+import logging
+import random
 import re
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
-import requests
-from PIL import Image
-from threadpool import *
+from wechat_mp.analysis import fetch_user_analysis
+from wechat_mp.cursor import PageCursor
+from wechat_mp.exceptions import InvalidAccountOrPassword, RateLimitExceeded, UserAnalysisError
+from wechat_mp.metrics import DEFAULT_METRICS
+from wechat_mp.models import OfficalAccount, ArticleWithContent, ArticleSearchResult
+from wechat_mp.profiling import phase
+from wechat_mp.ratelimit import RateLimiter
+from wechat_mp.store import SessionStore
+from wechat_mp.transport import DEFAULT_TRANSPORT
+from wechat_mp.utils import encrypt, extract_cgi_data
 
-from wechat_mp.exceptions import *
-from wechat_mp.models import *
-from wechat_mp.utils import *
-
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s [%(threadName)s:%(thread)d] [%(name)s:%(lineno)d] [%(module)s:%(funcName)s] [%(levelname)s]- %(message)s')
-
-console = logging.StreamHandler()
-console.setLevel(logging.INFO)
 logger = logging.getLogger('wechat_mp')
-logger.addHandler(console)
-logger.propagate = False
 
 
 class WeChat:
     """
     主要的API操作程序，用来登陆和调用API方法
+
+    创建对象时不会发出请求，第一次调用API时才会恢复保存的登陆状态或者开始扫码登陆，
+    需要立即登陆时调用 :meth:`login`
+
+    一个对象可以同时被多个线程使用，例如在ThreadPoolExecutor中并发调用API：登陆和刷新token都在同一个锁中进行，
+    同时发现token失效的多个线程只会刷新一次；请求头按请求传入，不会修改共用的session；
+    分页状态保存在每次调用自己的游标中
+
     :param email: 登陆微信后台的邮箱
     :type email: str
     :param password: 登陆密码
     :type password: str
-    :param enable_cookies: 是否允许保存cookies，避免多次扫码登陆。
+    :param enable_cookies: 是否允许保存cookies，避免多次扫码登陆。同时会保存限速器学习到的请求速率
     :type enable_cookies: bool
+    :param session_store: 保存登陆状态的对象，enable_cookies为True时默认保存在./sessions目录
+    :type session_store: :class:`SessionStore <wechat_mp.store.SessionStore>`
+    :param rate_limiter: 分页请求使用的限速器，默认每个账号一个
+    :type rate_limiter: :class:`RateLimiter <wechat_mp.ratelimit.RateLimiter>`
+    :param cache: 分页响应缓存，默认不缓存
+    :type cache: :class:`ResponseCache <wechat_mp.cache.ResponseCache>`
+    :param token_ttl: 保存的token在验证后多少秒内直接使用，不再请求首页验证
+    :type token_ttl: int
+    :param analysis_store: 保存用户分析数据的对象，设置后过去日期的数据只请求一次
+    :type analysis_store: :class:`AnalysisStore <wechat_mp.store.AnalysisStore>`
+    :param adapter: 挂载到后台地址上的requests transport adapter，例如 :mod:`wechat_mp.testing` 中的录制和回放
+    :type adapter: :class:`requests.adapters.BaseAdapter`
+    :param metrics: 记录每个API请求统计的对象，默认所有客户端共用 ``DEFAULT_METRICS``
+    :type metrics: :class:`Metrics <wechat_mp.metrics.Metrics>`
+    :param transport: HTTP连接池和预先生成的请求头，默认所有客户端共用 ``DEFAULT_TRANSPORT``
+    :type transport: :class:`Transport <wechat_mp.transport.Transport>`
+    :param max_throttle_retries: 同一个请求连续被限制频率时最多重试的次数，超过后抛出
+        :class:`RateLimitExceeded <wechat_mp.exceptions.RateLimitExceeded>`
+    :type max_throttle_retries: int
     """
 
-    def __init__(self, email, password, enable_cookies=False):
+    # 登陆状态失效时返回的错误码：invalid session 和 invalid csrf token
+    _invalid_session_rets = (200003, 200040)
+
+    # 各个分页API的响应中，列表数据和总数的键
+    _page_fields = {
+        'search account': ('list', 'total'),
+        'article list': ('app_msg_list', 'app_msg_cnt'),
+        'search article': ('list', 'total'),
+    }
+
+    def __init__(self, email, password, enable_cookies=False, rate_limiter=None, cache=None, session_store=None,
+                 token_ttl=1800, analysis_store=None, adapter=None, metrics=None, transport=None,
+                 max_throttle_retries=10):
         self.email = email
         self.password = password
         self.enable_cookies = enable_cookies
+        self.cache = cache
+        self.rate_limiter = rate_limiter or RateLimiter(
+            filename="./ratelimit.json" if enable_cookies else None, namespace=email)
+        self.session_store = session_store or (SessionStore() if enable_cookies else None)
+        self.token_ttl = token_ttl
+        self.analysis_store = analysis_store
+        self.adapter = adapter
+        self.metrics = metrics or DEFAULT_METRICS
+        self.transport = transport or DEFAULT_TRANSPORT
+        self.max_throttle_retries = max_throttle_retries
 
         self._base_url = 'https://mp.weixin.qq.com'
         self._is_login = False
+        self._verified_at = 0
+        self._login_lock = threading.RLock()
         self.token = None
-        self.accounts = self._load_accounts() or {}
-        pkl_data = self._load_session()
-        if pkl_data:
-            self.session = pkl_data.get("session")
-            self.token = pkl_data.get("token")
-        else:
-            self.session = requests.Session()
-            self.session.headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 \
-                (KHTML, like Gecko) Chrome/63.0.3218.0 Safari/537.36',
-                'Origin': 'https://mp.weixin.qq.com',
-                'Pragma': 'no-cache',
-                'Cache-Control': 'no-cache',
-                'X-Requested-With': 'XMLHttpRequest',
-                'Content-Type': 'application/x-www-form-urlencoded;charset="UTF-8"',
-                'Accept': '*/*',
-                'Referer': 'https://mp.weixin.qq.com/'
-            }
+        self.session = None
+
+    def login(self):
+        """
+        立即登陆，已经登陆时不做任何事情
+
+        :return: self
+        """
+        self._ensure_login()
+        return self
+
+    def _ensure_login(self):
+        """调用API之前确保已经登陆，优先恢复保存的登陆状态，否则开始扫码登陆"""
+        if self._is_login:
+            return
+        with self._login_lock:
+            # 等待锁的时候其他线程可能已经登陆了
+            if self._is_login or self._load_session():
+                return
+            if self.password is None:
+                raise InvalidAccountOrPassword(f"账号 {self.email} 的登录状态已失效，没有密码无法重新登陆")
+            self.session = self._new_session()
             self._start_login()
 
+    def _new_session(self):
+        """创建一个还没有登陆的session"""
+        return self._mount(self.transport.new_session())
+
+    def _mount(self, session):
+        """把共用的连接池和设置的adapter挂载到session上，adapter优先"""
+        self.transport.mount(session)
+        if self.adapter is not None:
+            session.mount(self._base_url, self.adapter)
+        return session
+
+    @classmethod
+    def from_account(cls, account_info, token_ttl=1800, adapter=None, transport=None):
+        """
+        使用已保存的账号信息创建客户端，不会触发扫码登陆
+
+        :param account_info: :meth:`SessionStore.load <wechat_mp.store.SessionStore.load>` 返回的账号信息，
+            也可以是旧版本sessions.pkl中包含session的账号信息
+        :param token_ttl: 保存的token在验证后多少秒内直接使用，不再请求首页验证
+        :param adapter: 挂载到后台地址上的requests transport adapter
+        :param transport: HTTP连接池，默认为 ``DEFAULT_TRANSPORT``
+        :return: session有效时返回WeChat对象，否则返回None
+        """
+        client = cls(account_info.get("email"), account_info.get("password"), token_ttl=token_ttl, adapter=adapter,
+                     transport=transport)
+        if client._restore_account(account_info):
+            return client
+        return None
+
     def api_collections(self, name, path):
         """
         统一管理所有运用到的API
@@ -115,6 +198,22 @@ class WeChat:
         :param img_code: 验证码结果
         :return:
         """
+        ret = self._submit_login(img_code)
+        if ret == 200023:
+            raise InvalidAccountOrPassword(f"账号：{self.email} 或者 密码：{self.password} 不正确")
+        elif ret == 200008:
+            # {"base_resp":{"err_msg":"need verify code","ret":200008}}
+            self._verify_captcha()
+        elif ret == 0:
+            self._verify_qrcode()
+
+    def _submit_login(self, img_code=''):
+        """
+        post登陆邮箱和密码
+
+        :param img_code: 验证码结果
+        :return: 响应中的ret，0表示需要扫码，200008表示需要验证码，200023表示账号或者密码错误，请求失败时返回None
+        """
         data = {
             'username': self.email,
             'pwd': encrypt(self.password[0:16].encode('utf-8')),
@@ -126,46 +225,55 @@ class WeChat:
         }
 
         api = self.api_collections('login', 'start login')
-        response = self.session.post(api, data=data)
+        response = self._http('start login', 'POST', api, data=data)
 
         logger.info("开始模拟登陆 账号 %s", self.email)
         if response.status_code == 200:
             base_resp = response.json().get('base_resp')
-            if base_resp and base_resp['ret'] == 200023:
-                raise InvalidAccountOrPassword(f"账号：{self.email} 或者 密码：{self.password} 不正确")
-            elif base_resp and base_resp['ret'] == 200008:
-                # {"base_resp":{"err_msg":"need verify code","ret":200008}}
-                self._verify_captcha()
-            elif base_resp and base_resp['ret'] == 0:
-                self._verify_qrcode()
+            if base_resp:
+                return base_resp['ret']
+        return None
 
     def _verify_captcha(self):
         """验证码识别"""
-        api = self.api_collections('login', 'captcha url').format(self.email, int(time.time()) * 1000)
-        response = self.session.post(api)
-        captcha = Image.open(BytesIO(response.content))
+        from PIL import Image
+
+        captcha = Image.open(BytesIO(self._fetch_captcha()))
         captcha.show()
         captcha_result = input("输入验证码: ", )
         self._start_login(captcha_result)
 
+    def _fetch_captcha(self):
+        """获取验证码图片的内容"""
+        api = self.api_collections('login', 'captcha url').format(self.email, int(time.time()) * 1000)
+        return self._http('captcha url', 'POST', api).content
+
     def _verify_qrcode(self):
         """
         获取验证二维码，显示后监控是否扫码
         :return:
         """
+        from PIL import Image
+
+        image = Image.open(BytesIO(self._fetch_qrcode()))
+        image.show()
+        logger.info("已经获取二维码图片并显示，等待扫码")
+        self._check_scan_qrcode()
+
+    def _fetch_qrcode(self):
+        """
+        跳转二维码扫码页面并获取二维码图片的内容
+        :return: 图片内容
+        """
         redirect_url = self.api_collections('login', 'redirect url').format(urllib.parse.quote(self.email))
         # 跳转二维码扫码页面
         logger.info("跳转二维码扫码页面")
-        response = self.session.get(redirect_url)
+        response = self._http('redirect url', 'GET', redirect_url)
         # 响应内容见response/verify_qrcode.json
 
         # 获取二维码图片，显示后等待扫码
         qrcode_url = self.api_collections('login', 'qrcode url').format(random.randint(200, 999))
-        response = self.session.get(qrcode_url)
-        image = Image.open(BytesIO(response.content))
-        image.show()
-        logger.info("已经获取二维码图片并显示，等待扫码")
-        self._check_scan_qrcode()
+        return self._http('qrcode url', 'GET', qrcode_url).content
 
     def _check_scan_qrcode(self):
         """
@@ -175,26 +283,34 @@ class WeChat:
         logger.info("开始检查二维码是否被扫和是否已确认")
         while not self._is_login:
             time.sleep(2)
-            check_url = self.api_collections('login', 'check login')
-            response = self.session.get(check_url).json()
-
-            status = response['status']
-
-            if status == 0:
-                logger.info("尚未扫码")
-            elif status == 4:
-                logger.info("已经扫码了，等待确认")
-            elif status == 1:
-                logger.info("已完成扫码，开始post登陆到微信后台的请求")
+            if self._check_login_status() == 1:
                 # 确认完成扫码并确认后，post登陆到微信后台的请求
                 self._post_login()
 
+    def _check_login_status(self):
+        """
+        检测一次是否扫码并确认登陆了
+        :return: 0为尚未扫码，4为已经扫码等待确认，1为已经确认
+        """
+        check_url = self.api_collections('login', 'check login')
+        response = self._http('check login', 'GET', check_url).json()
+
+        status = response['status']
+
+        if status == 0:
+            logger.info("尚未扫码")
+        elif status == 4:
+            logger.info("已经扫码了，等待确认")
+        elif status == 1:
+            logger.info("已完成扫码，开始post登陆到微信后台的请求")
+        return status
+
     def _post_login(self):
         """
         扫码确认后方可进行这步操作
         :return:
         """
-        self.session.headers.update({'Referer': self.api_collections('login', 'redirect url').format(urllib.parse.quote(self.email))})
+        headers = {'Referer': self.api_collections('login', 'redirect url').format(urllib.parse.quote(self.email))}
 
         login_url = self.api_collections('login', 'post login')
 
@@ -206,7 +322,7 @@ class WeChat:
         }
 
         # post登陆
-        response = self.session.post(login_url, data=json.dumps(data))
+        response = self._http('post login', 'POST', login_url, data=json.dumps(data), headers=headers)
         if response.status_code == 200:
             logger.info("Post登陆成功")
         else:
@@ -218,54 +334,129 @@ class WeChat:
     def _get_token(self, session):
         # post登陆之后，需要获取token，这个token是调用其他接口的唯一凭证
         # 因为已经登录了，随便访问首页都能得到token，通过正则提取即可
-        response = session.get('https://mp.weixin.qq.com/')
-        find_token = re.findall(r'&token=(\d+)', response.text)
-        if find_token:
-            self.token = find_token[0]
-            logger.info("获取token：%s", self.token)
-            self._is_login = True
+        with self._login_lock:
+            response = self._http('home', 'GET', self._base_url + '/', session=session)
+            find_token = re.findall(r'&token=(\d+)', response.text)
+            if find_token:
+                self._set_login(session, find_token[0], time.time())
+                logger.info("获取token：%s", self.token)
+                self._dump_session()
+                return True
+            else:
+                self._is_login = False
+                self._delete_session()
+                return False
+
+    def _refresh_token(self, stale_token):
+        """
+        请求返回登陆状态失效时重新获取token，其他线程已经刷新过时直接使用新的token
+
+        :param stale_token: 失效的请求使用的token
+        :return: 是否有可用的token
+        """
+        with self._login_lock:
+            if self._is_login and self.token != stale_token:
+                return True
+            return self._get_token(self.session)
+
+    def _send_with_token(self, send, *args):
+        """
+        确保已经登陆后用当前的token调用send，响应表示登陆状态失效时重新获取token后重试一次。
+        分页、用户分析和用户属性等所有需要token的请求都经过这里，多个线程同时发现token失效时只刷新一次
+
+        :param send: 发出一次请求的方法，返回响应字典
+        :return: 响应字典
+        """
+        self._ensure_login()
+        token = self.token
+        response = send(*args)
+        base_resp = response.get('base_resp') if isinstance(response, dict) else None
+        if base_resp and base_resp.get('ret') in self._invalid_session_rets and self._refresh_token(token):
+            # 直接使用的token可能已经失效，重新获取token后重试一次
+            response = send(*args)
+        return response
+
+    def _set_login(self, session, token, verified_at):
+        """记录登陆状态和token最近一次验证的时间"""
+        with self._login_lock:
             self.session = session
-            self._dump_session()
-            return True
-        else:
-            self._delete_session()
-            return False
+            self.token = token
+            self._verified_at = verified_at
+            self._is_login = True
 
-    def _dump_session(self, filename="./sessions.pkl"):
-        """序列化session"""
-        if not self.enable_cookies:
-            return
+    def _restore_account(self, account):
+        """
+        使用保存的账号信息恢复登陆状态，token在token_ttl秒内验证过时直接使用，
+        否则请求首页重新获取token
 
-        account_info = {
-            "create_time": int(time.time()),
-            "session": self.session,
-            "email": self.email,
-            "password": self.password,
-            "token": self.token
-        }
-        self.accounts.update({self.email: account_info})
-        with open(filename, 'wb') as f:
-            pickle.dump(self.accounts, f)
+        :param account: 保存的账号信息
+        :return: 是否恢复成功
+        """
+        session = account.get("session")
+        if session is None:
+            session = SessionStore.restore_session(account)
+        self._mount(session)
+        verified_time = account.get("verified_time") or 0
+        if account.get("token") and time.time() - verified_time < self.token_ttl:
+            self._set_login(session, account["token"], verified_time)
+            logger.info("使用%s秒前验证过的token：%s", int(time.time() - verified_time), self.token)
+            return True
+        return self._get_token(session)
 
-    def _load_accounts(self, filename="./sessions.pkl"):
-        """从pkl文件中加载所有账号信息, 数据格式参考response/accounts.json"""
-        if not os.path.exists(filename):
-            return {}
+    def _http(self, endpoint, method, url, session=None, **kwargs):
+        """
+        所有请求都经过这里，按API名称记录耗时、状态码和响应字节数
 
-        with open(filename, 'rb') as f:
-            return pickle.load(f, encoding='utf-8')
+        :param endpoint: api_collections中的API名称
+        :param method: GET或者POST
+        :param url: 请求地址
+        :param session: 使用的session，默认为当前的session
+        :return: requests.Response
+        """
+        session = session or self.session
+        start = time.perf_counter()
+        with phase('network'):
+            try:
+                response = session.request(method, url, **kwargs)
+                size = len(response.content)
+            except Exception as e:
+                self.metrics.error(endpoint, e)
+                raise
+        self.metrics.observe(endpoint, time.perf_counter() - start, response.status_code, size)
+        return response
+
+    def _http_json(self, endpoint, method, url, **kwargs):
+        """请求返回json的API，同时记录响应中的base_resp.ret"""
+        response = self._http(endpoint, method, url, **kwargs)
+        with phase('parse'):
+            data = response.json()
+        base_resp = data.get('base_resp') if isinstance(data, dict) else None
+        if base_resp:
+            self.metrics.ret(endpoint, base_resp.get('ret'))
+        return data
+
+    def _dump_session(self):
+        """保存当前账号的cookies、token和token验证的时间"""
+        if self.session_store is None:
+            return
+        self.session_store.save(self.email, self.session, self.token, verified_time=int(self._verified_at))
 
     def _load_session(self):
-        """反序列化session"""
-        # 检查accounts里有没有 对应的账号
-        account = self.accounts.get(self.email)
-        if account:
-            if self._get_token(account.get("session")):
-                return account
-            else:
-                print("登录状态已失效.")
-                self._delete_session()
-        return None
+        """只读取当前账号保存的登陆状态，并检查是否仍然有效"""
+        if self.session_store is None:
+            return None
+
+        with self._login_lock:
+            account = self.session_store.load(self.email)
+            if account is None and not self.session_store.emails():
+                # 兼容旧版本，第一次使用时把sessions.pkl中的账号导入进来
+                if self.session_store.import_pickle():
+                    account = self.session_store.load(self.email)
+            if account:
+                if self._restore_account(account):
+                    return account
+                logger.info("登录状态已失效.")
+            return None
 
     def _delete_session(self):
         """
@@ -273,9 +464,10 @@ class WeChat:
         如果在搜索公众号或者文章中 返回的响应 invalid session
         :return:
         """
-        del self.accounts[self.email]
+        if self.session_store is not None:
+            self.session_store.delete(self.email)
 
-    def search_account(self, name_or_id, limit=0, interval=3):
+    def search_account(self, name_or_id, limit=0, interval=None, cursor=None, workers=1):
         """
         根据公众号名称或者ID查询公众号列表
 
@@ -283,160 +475,296 @@ class WeChat:
         :type name_or_id: str
         :param limit: 获取多少条查询记录
         :type limit: int
-        :type interval: int 请求时间间隔，秒
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :param workers: 并发请求的线程数，大于1时获取第一页得到总数后，其余的页并发获取，仍然受限速器限制
+        :type workers: int
         :return:  :class:`OfficalAccount <wechat_mp.models.OfficalAccount>` 对象列表
         """
+        cursor = PageCursor.prepare(cursor, 'search account', {'query': name_or_id}, 5)
+        accounts = self._collect(cursor, self._search_account_pages, limit, interval, "个公众号", workers)
+        with phase('model'):
+            return [OfficalAccount(account, self) for account in accounts]
 
-        search_api = self.api_collections('search', 'search account').format(self.token, random.randint(200, 999))
-        params = {
-            'query': name_or_id,
-            'begin': 0,
-            'count': 5,
-        }
-        response = self.session.get(search_api, params=params).json()
-
-        accounts = []
-        base_resp = response.get('base_resp')
-
-        if base_resp['ret'] == 200013:
-            logger.warning("请求频率出现限制，暂停60秒")
-            time.sleep(60)
-            return self.search_account(name_or_id)
-
-        begin = 0
-
-        total = response.get('total')
-        if limit == 0:
-            logger.info("一共搜到%s个公众号,已设置不限制获取数量", total)
-            bar = tqdm(total=total)
-            limit = total
-        else:
-            logger.info("一共搜到%s个公众号,已设置限制获取前%s个公众号", total, limit)
-            bar = tqdm(total=limit)
-
-        bar.set_description("进度条")
-        reach_limit = False
-
-        while not reach_limit:
-
-            page_result = self._search_account_pages(search_api, params)
-            if not page_result:
-                reach_limit = True
-            for account in page_result:
-                if len(accounts) >= limit or len(accounts) > total:
-                    reach_limit = True
-                else:
-                    accounts.append(account)
-                    bar.update(1)
+    def iter_accounts(self, name_or_id, limit=0, interval=None, cursor=None):
+        """
+        逐个返回查询到的公众号，每获取一页就立即返回这一页的公众号，
+        停止迭代后不再发出请求，内存中最多只保存一页数据
 
-            begin += 5
-            params['begin'] = begin
-            time.sleep(interval)
-        bar.close()
-        return [OfficalAccount(account, self) for account in accounts]
+        :param name_or_id: 公众号的名称或者微信ID/原始ID
+        :type name_or_id: str
+        :param limit: 获取多少条查询记录
+        :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，游标只记录位置，不保存数据
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return: :class:`OfficalAccount <wechat_mp.models.OfficalAccount>` 对象的生成器
+        """
+        cursor = PageCursor.prepare(cursor, 'search account', {'query': name_or_id}, 5, keep_items=False)
+        for page_items in self._paginate(cursor, self._search_account_pages, limit, interval):
+            with phase('model'):
+                accounts = [OfficalAccount(account, self) for account in page_items]
+            yield from accounts
 
-    def _search_account_pages(self, api, params):
+    def _search_account_pages(self, params, interval=None):
         """
         根据页数不断地进行请求
 
-        :param api: 请求的API
         :param params: 包含起始的参数
-        :return: 账号字典列表
+        :param interval: 固定的请求时间间隔，秒
+        :return: 响应字典
         """
-        accounts = []
-        response = self.session.get(api, params=params).json()
-        if response['base_resp']['ret'] == 0:
-            account_list = response.get('list')
-            accounts += account_list
-        return accounts
+        return self._request_page('search account', params, interval)
 
-    def search_article(self, keyword, limit=0, interval=3):
+    def search_article(self, keyword, limit=0, interval=None, cursor=None, workers=1):
         """
         根据关键词搜索原创文章
         :param keyword: 包含关键词的标题
         :param limit:设置获取多少篇文章
-        :type interval: int 请求时间间隔，秒
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :param workers: 并发请求的线程数，大于1时获取第一页得到总数后，其余的页并发获取，仍然受限速器限制
+        :type workers: int
         :return:文章列表
         """
+        cursor = PageCursor.prepare(cursor, 'search article', {"url": keyword, "allow_reprint": 0}, 20)
+        article_list = self._collect(cursor, self._search_article_pages, limit, interval, "篇图文", workers)
+        with phase('model'):
+            return ArticleSearchResult([ArticleWithContent(article) for article in article_list], type=0)
 
-        headers = {
-            'Host': 'mp.weixin.qq.com',
-            'Connection': 'keep-alive',
-            'Origin': 'https://mp.weixin.qq.com',
-            'X-Requested-With': 'XMLHttpRequest',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/59.0.3071.115 Safari/537.36',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'Accept': '*/*',
-            'Referer': f"https://mp.weixin.qq.com/cgi-bin/appmsg?t=media/appmsg_edit_v2&action=edit&isNew=1&type=10&share=1&token={self.token}&lang=zh_CN",
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Accept-Language': 'zh-CN,zh;q=0.8', }
-
-        search_api = self.api_collections('search', 'search article')
-        begin = 0
-        count = 20
-        post_data = {
-            "token": self.token,
-            "lang": "zh_CN",
-            "f": "json",
-            "random": random.randrange(0, 999),
-            "url": keyword,
-            "allow_reprint": 0,
-            "begin": begin,
-            "count": count
-        }
-        response = self.session.post(search_api, data=post_data).json()
-        total = response.get("total")
-        article_list = []
-
-        if limit == 0:
-            logger.info("一共搜到%s篇图文,已设置不限制获取数量", total)
-            bar = tqdm(total=total)
-            limit = total
+    def iter_search_article(self, keyword, limit=0, interval=None, cursor=None):
+        """
+        逐篇返回根据关键词搜索到的原创文章，每获取一页就立即返回这一页的图文，
+        停止迭代后不再发出请求，内存中最多只保存一页数据
+
+        :param keyword: 包含关键词的标题
+        :param limit:设置获取多少篇文章
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，游标只记录位置，不保存数据
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return: :class:`ArticleWithContent <wechat_mp.models.ArticleWithContent>` 对象的生成器
+        """
+        cursor = PageCursor.prepare(cursor, 'search article', {"url": keyword, "allow_reprint": 0}, 20,
+                                    keep_items=False)
+        for page_items in self._paginate(cursor, self._search_article_pages, limit, interval):
+            with phase('model'):
+                articles = [ArticleWithContent(article) for article in page_items]
+            yield from articles
+
+    def _search_article_pages(self, data, interval=None):
+        """
+        根据页数不断地进行请求
+
+        :param data: 包含起始的数据
+        :param interval: 固定的请求时间间隔，秒
+        :return: 响应字典
+        """
+        return self._request_page('search article', data, interval)
+
+    def _paginate(self, cursor, fetch_page, limit=0, interval=None, workers=1):
+        """
+        从游标的位置开始不断地请求下一页，每获取一页都交给游标记录，
+        请求失败或者程序中断时，游标停留在没有获取的那一页
+
+        :param cursor: 分页游标
+        :param fetch_page: 传入分页参数和请求间隔，返回响应字典的方法
+        :param limit: 最多获取的数量，0表示不限制
+        :param interval: 固定的请求时间间隔，秒
+        :param workers: 并发请求的线程数
+        :return: 每一页字典列表的生成器
+        """
+        for response in self._page_responses(cursor, fetch_page, limit, interval, workers):
+            page_items = self._accept_page(cursor, response, limit)
+            if page_items is None:
+                return
+            yield page_items
+
+    def _accept_page(self, cursor, response, limit=0):
+        """
+        把一页响应交给游标记录，同步和异步的分页共用
+
+        :param cursor: 分页游标
+        :param response: 响应字典
+        :param limit: 最多获取的数量，0表示不限制
+        :return: 这一页保留的字典列表，请求失败时返回None
+        """
+        items_key, total_key = self._page_fields[cursor.endpoint]
+        base_resp = response['base_resp']
+        if base_resp['ret'] != 0:
+            logger.warning("%s 第%s条开始的一页请求失败：%s", cursor.endpoint, cursor.begin, base_resp)
+            return None
+
+        if cursor.total is None:
+            cursor.total = response.get(total_key) or 0
+        page_result = response.get(items_key) or []
+        if limit:
+            page_items = page_result[:limit - cursor.fetched]
         else:
-            logger.info("一共搜到%s篇图文,已设置限制获取前%s篇图文", total, limit)
-            bar = tqdm(total=limit)
-
-        bar.set_description("进度条")
-        reach_limit = False
-
-        while not reach_limit:
-            page_result = self._search_article_pages(search_api, data=post_data, headers=headers)
-            if not page_result:
-                reach_limit = True
-            for article in page_result:
-                if len(article_list) >= limit or len(article_list) > total:
-                    reach_limit = True
+            page_items = page_result
+        cursor.advance(page_items, len(page_result))
+        return page_items
+
+    def _page_responses(self, cursor, fetch_page, limit, interval, workers):
+        """
+        按顺序返回每一页的响应，知道总数并且workers大于1时，剩下的页并发请求
+
+        :return: 响应字典的生成器
+        """
+        while not cursor.finished and (not limit or cursor.fetched < limit):
+            if workers > 1 and cursor.total is not None:
+                yield from self._fan_out(cursor, fetch_page, limit, interval, workers)
+                return
+            yield fetch_page(cursor.params, interval)
+
+    def _fan_out(self, cursor, fetch_page, limit, interval, workers):
+        """
+        根据总数一次算出剩下所有页的起始位置，用线程池并发请求，再按顺序返回响应。
+        每个请求都经过限速器，停止迭代时取消还没有开始的请求
+
+        :return: 响应字典的生成器
+        """
+        end = cursor.total
+        if limit:
+            end = min(end, cursor.begin + limit - cursor.fetched)
+        offsets = range(cursor.begin, end, cursor.count)
+        logger.info("%s 剩余%s页，使用%s个线程并发获取", cursor.endpoint, len(offsets), workers)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(fetch_page, dict(cursor.query, begin=begin, count=cursor.count), interval)
+                       for begin in offsets]
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _collect(self, cursor, fetch_page, limit, interval, unit, workers=1):
+        """
+        获取所有分页数据并显示进度条
+
+        :param cursor: 分页游标
+        :param fetch_page: 传入分页参数和请求间隔，返回响应字典的方法
+        :param limit: 最多获取的数量，0表示不限制
+        :param interval: 固定的请求时间间隔，秒
+        :param unit: 日志中的单位，例如"个公众号"
+        :param workers: 并发请求的线程数
+        :return: 游标中的字典列表
+        """
+        from tqdm import tqdm
+
+        bar = None
+        fetched = cursor.fetched
+        for page_items in self._paginate(cursor, fetch_page, limit, interval, workers):
+            if bar is None:
+                if limit == 0:
+                    logger.info("一共搜到%s%s,已设置不限制获取数量", cursor.total, unit)
+                    bar = tqdm(total=cursor.total, initial=fetched)
                 else:
-                    article_list.append(article)
-                    bar.update(1)
+                    logger.info("一共搜到%s%s,已设置限制获取前%s%s", cursor.total, unit, limit, unit)
+                    bar = tqdm(total=min(limit, cursor.total), initial=fetched)
+                bar.set_description("进度条")
+            bar.update(len(page_items))
+        if bar is not None:
+            bar.close()
+        return cursor.items
+
+    def _send_page(self, path, params):
+        """
+        使用当前账号的token和session请求一页搜索结果，
+        :class:`SessionPool <wechat_mp.pool.SessionPool>` 重写了这个方法，把每一页分发到不同的账号
 
-            begin += 20
-            post_data['begin'] = begin
-            time.sleep(interval)
-        bar.close()
+        :param path: api_collections中search分类下的API名称
+        :param params: 分页参数，不需要包含token
+        :return: 响应字典
+        """
+        return self._send_with_token(self._send_page_once, path, params)
+
+    def _send_page_once(self, path, params):
+        """使用当前的token请求一页"""
+        token = self.token
+        api = self.api_collections('search', path).format(token, random.randint(200, 999))
+        if path == 'search article':
+            data = dict(params, token=token, lang='zh_CN', f='json', random=random.randrange(0, 999))
+            return self._http_json(path, 'POST', api, data=data, headers=self.transport.headers(path, token))
+        return self._http_json(path, 'GET', api, params=params)
+
+    def _request_page(self, path, params, interval=None):
+        """
+        经过缓存和限速器请求一页搜索结果，缓存命中时不发出请求也不等待，
+        被限制频率时退避后重试当前页
 
-        return ArticleSearchResult([ArticleWithContent(article) for article in article_list], type=0)
+        :param path: api_collections中search分类下的API名称
+        :param params: 分页参数，不需要包含token
+        :param interval: 固定的请求时间间隔，秒。为None时使用限速器学习到的速率
+        :return: 响应字典
+        """
+        return self._drive(self._page_steps(path, params, interval), lambda: self._send_page(path, params))
 
-    def _search_article_pages(self, api, data, headers):
+    def _page_steps(self, path, params, interval=None):
         """
-        根据页数不断地进行请求
+        请求一页的步骤，同步和异步客户端共用：缓存命中时直接返回，否则经过限速器请求，
+        被限制频率时退避后重试，成功的响应写入缓存
 
-        :param api: 请求的API
-        :param data: 包含起始的数据
-        :return: 图文字典列表
+        :return: 请求步骤的生成器，见 :meth:`_throttle_steps`
         """
-        article_list = []
+        if self.cache is not None:
+            response = self.cache.get(path, params)
+            if response is not None:
+                return response
 
-        response = self.session.post(api, data=data, headers=headers).json()
+        response = yield from self._throttle_steps(path, interval)
 
-        if response['base_resp']['ret'] == 0:
-            articles = response.get('list')
-            article_list += articles
+        if self.cache is not None and response['base_resp']['ret'] == 0:
+            self.cache.set(path, params, response)
+        return response
 
-        return article_list
+    def _throttle_steps(self, endpoint, interval=None):
+        """
+        经过限速器的请求步骤，被限制频率(ret 200013)时退避后重试，
+        连续被限制超过max_throttle_retries次时抛出 :class:`RateLimitExceeded <wechat_mp.exceptions.RateLimitExceeded>`。
+        每次yield需要等待的秒数，调用者等待后发出请求，把响应字典send回来，生成器的返回值是最后的响应
 
-    
-    def get_user_analysis(self, start_date, end_date, source=99999999):
+        :param endpoint: 限速器中的API名称
+        :param interval: 固定的请求时间间隔，秒。为None时使用限速器学习到的速率
+        """
+        retries = 0
+        while True:
+            response = yield self.rate_limiter.reserve(endpoint, interval)
+            if response.get('base_resp', {}).get('ret') != 200013:
+                self.rate_limiter.succeeded(endpoint)
+                return response
+            self.rate_limiter.throttled(endpoint)
+            retries += 1
+            if retries > self.max_throttle_retries:
+                raise RateLimitExceeded(f"账号 {self.email} 的 {endpoint} 请求连续{retries}次被限制频率")
+
+    @staticmethod
+    def _drive(steps, send):
+        """
+        同步地执行请求步骤：按照yield的秒数等待，然后调用send发出请求
+
+        :param steps: 请求步骤的生成器
+        :param send: 发出一次请求、返回响应字典的方法
+        :return: 生成器的返回值
+        """
+        try:
+            wait = next(steps)
+            while True:
+                if wait > 0:
+                    with phase('sleep'):
+                        time.sleep(wait)
+                wait = steps.send(send())
+        except StopIteration as e:
+            return e.value
+
+    def get_user_analysis(self, start_date, end_date, source=99999999, interval=None):
         """
         获取用户分析数据
 
@@ -451,30 +779,69 @@ class WeChat:
         名片分享：17
         支付后关注：51
         其他合计：0
-        :return:
+        :param interval: 固定的请求时间间隔，秒。为None时使用限速器学习到的速率
+        :return: 包含user_source和每日数据list的字典，请求失败时抛出
+            :class:`UserAnalysisError <wechat_mp.exceptions.UserAnalysisError>`
         """
-        headers = {
-            'Host': 'mp.weixin.qq.com',
-            'Connection': 'keep-alive',
-            'Origin': 'https://mp.weixin.qq.com',
-            'X-Requested-With': 'XMLHttpRequest',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/59.0.3071.115 Safari/537.36',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'Accept': '*/*',
-            'Referer': f"https://mp.weixin.qq.com/misc/useranalysis?=&token={self.token}&lang=zh_CN",
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Accept-Language': 'zh-CN,zh;q=0.8', }
+        if self.analysis_store is not None:
+            # 只请求没有保存的日期和最近仍然可能变化的日期
+            result = fetch_user_analysis(self, (start_date, end_date), [source], workers=1, interval=interval)
+            return {'user_source': source, 'list': result[self.email][source]}
+
+        data_str = self._request_analysis(start_date, end_date, source, interval)
+        base_resp = data_str.get('base_resp', {})
+        if base_resp.get('ret') != 0:
+            raise UserAnalysisError(f"账号 {self.email} 渠道 {source} {start_date}至{end_date} 的用户分析请求失败：{base_resp}",
+                                    [(self.email, source, start_date, end_date, base_resp)])
+        return data_str['category_list'][0]
+        # {'user_source': 99999999, 'list': [{'date': '2020-01-01', 'new_user': 0, 'cancel_user': 0, 'netgain_user': 0, 'cumulate_user': 141},
 
-        api = self.api_collections('user_analysis', 'get analysis').format(start_date,end_date,source,self.token)
+    def _request_analysis(self, start_date, end_date, source, interval=None):
+        """
+        经过限速器请求一次用户分析数据，被限制频率时退避后重试，
+        :mod:`wechat_mp.analysis` 的批量获取也使用这个方法
 
+        :return: 响应字典
+        """
+        return self._drive(self._throttle_steps('get analysis', interval),
+                           lambda: self._send_with_token(self._send_analysis, start_date, end_date, source))
 
+    def _send_analysis(self, start_date, end_date, source):
+        """使用当前账号的token请求一次用户分析数据"""
+        token = self.token
+        headers = self.transport.headers('get analysis', token)
 
-        # 先获取所有模板的总数
-        response = self.session.get(api, headers=headers)
+        api = self.api_collections('user_analysis', 'get analysis').format(start_date,end_date,source,token)
 
-        data_str = response.json()
-        return data_str['category_list'][0]
-        # {'user_source': 99999999, 'list': [{'date': '2020-01-01', 'new_user': 0, 'cancel_user': 0, 'netgain_user': 0, 'cumulate_user': 141},
+        return self._http_json('get analysis', 'GET', api, headers=headers)
+
+    def _send_property(self, start_date, end_date):
+        """
+        使用当前账号的token请求一次用户属性页面
+
+        :return: 页面中的window.cgiData，登陆状态失效时为包含base_resp的字典
+        """
+        token = self.token
+        headers = self.transport.headers('get property', token)
+
+        api = self.api_collections('user_analysis', 'get property').format(start_date,end_date,token)
+
+        response = self._http('get property', 'GET', api, headers=headers)
+
+        # 页面中的window.cgiData是JS对象字面量，一次扫描转换成Python数据，
+        # 解析失败是页面格式的问题，直接抛出，不当作登陆状态失效
+        if 'window.cgiData' in response.text:
+            with phase('parse'):
+                return extract_cgi_data(response.text)
+        # 不是用户属性页面时，后台返回的是包含错误码的json或者登陆页面
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get('base_resp'):
+            self.metrics.ret('get property', data['base_resp'].get('ret'))
+            return data
+        return {'base_resp': {'ret': self._invalid_session_rets[0], 'err_msg': '页面中没有找到window.cgiData'}}
 
     def get_user_propery(self, start_date, end_date):
         """
@@ -482,52 +849,17 @@ class WeChat:
 
         :param start_date: 开始日期 格式2020-02-25
         :param end_date: 截止日期 格式2020-02-25
-        :return:
+        :return: 用户属性字典，例如性别、语言、省份等分布，数量为int
         """
-        headers = {
-            'Host': 'mp.weixin.qq.com',
-            'Connection': 'keep-alive',
-            'Origin': 'https://mp.weixin.qq.com',
-            'X-Requested-With': 'XMLHttpRequest',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/59.0.3071.115 Safari/537.36',
-            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            'Accept': '*/*',
-            'Referer': f"https://mp.weixin.qq.com/misc/useranalysis?action=attr&token={self.token}&lang=zh_CN",
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Accept-Language': 'zh-CN,zh;q=0.8', }
-
-        api = self.api_collections('user_analysis', 'get property').format(start_date,end_date,self.token)
-
-
-        # 先获取所有模板的总数
-        response = self.session.get(api, headers=headers)
-
-        data_str = response.text
-        p = re.compile(r'window.cgiData = (\{[\s\S]*\});')
-        raw_string = p.findall(data_str)[0]
-        p = re.compile(r'\+\("(\d*)"\) \|\| 0')
-        p2 = re.compile(r'\s*(.*?): ')
-        new_string = ""
-        for l in raw_string.split("\n"):
-            r = p.findall(l)
-            r2 = p2.findall(l)
-
-            if r:
-                value = f'"count": {r[0]}'
-                value.strip()
-                new_string += value
-
-            if r2:
-                if "count" not in l:
-                    value = f'"{r2[0]}": '
-                    new_line = re.sub(r'\s*(.*?): ', value, l)
-                    new_string += new_line
-            else:
-                new_string += l
-
-        new_string = new_string.replace(' || "未知"',"")
-        new_string = re.sub(r'\s*',"", new_string)
-        new_string = new_string.replace(",]","]")
-        json_data = json.loads(new_string)
-        for k,v in json_data["list"][0].items():
-            print(k,v)
+        if self.analysis_store is not None:
+            data = self.analysis_store.get_property(self.email, start_date, end_date)
+            if data is not None:
+                return data
+
+        response = self._send_with_token(self._send_property, start_date, end_date)
+        if 'list' not in response:
+            raise ValueError(f"账号 {self.email} 的用户属性请求失败：{response.get('base_resp')}")
+        data = response['list'][0]
+        if self.analysis_store is not None:
+            self.analysis_store.put_property(self.email, start_date, end_date, data)
+        return data
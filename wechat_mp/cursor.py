@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: cursor.py
+@time: 2026/10/18 13:00
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger('wechat_mp')
+
+
+class PageCursor:
+    """
+    分页游标，记录一次分页获取的查询条件、当前的起始位置和已经获取的数据
+
+    设置了filename时每获取一页都会保存到文件，程序中断或者被限制频率后，
+    用同一个游标(或者同一个文件)再次调用就会从中断的那一页继续获取。
+    查询条件和位置保存在filename中，获取的数据逐页追加到 ``filename + '.items'`` 中，
+    每页只写入新的数据
+
+    :param endpoint: api_collections中search分类下的API名称
+    :param query: 除了begin和count之外的查询参数
+    :param count: 每页的数量
+    :param begin: 起始位置
+    :param total: 服务器返回的总数
+    :param items: 已经获取的字典列表
+    :param fetched: 已经获取的数量
+    :param filename: 保存游标的json文件
+    :param keep_items: 是否保存已经获取的数据，迭代器只需要保存起始位置
+    """
+
+    def __init__(self, endpoint, query, count, begin=0, total=None, items=None, fetched=0, finished=False,
+                 filename=None, keep_items=True):
+        self.endpoint = endpoint
+        self.query = query
+        self.count = count
+        self.begin = begin
+        self.total = total
+        self.items = items or []
+        self.fetched = fetched
+        self.finished = finished
+        self.filename = filename
+        self.keep_items = keep_items
+        # 已经追加到数据文件中的数量
+        self._saved_count = 0
+
+    @classmethod
+    def load(cls, filename):
+        """
+        从文件中恢复游标
+
+        :param filename: 保存游标的json文件
+        :return: :class:`PageCursor <wechat_mp.cursor.PageCursor>` 对象
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        # 只读取已经记录在游标中的数量，忽略写入数据后、保存位置前中断时多写的一页
+        item_count = data.pop('item_count', 0)
+        items = []
+        complete = True
+        if item_count:
+            with open(cls._items_filename(filename), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if len(items) >= item_count:
+                        complete = False
+                        break
+                    items.append(json.loads(line))
+        cursor = cls(filename=filename, items=items, **data)
+        # 有多写的数据时，下次保存重写整个数据文件
+        cursor._saved_count = len(items) if complete else 0
+        return cursor
+
+    @staticmethod
+    def _items_filename(filename):
+        return f"{filename}.items"
+
+    @classmethod
+    def prepare(cls, cursor, endpoint, query, count, keep_items=True):
+        """
+        为一次分页获取准备游标
+
+        :param cursor: None、游标对象或者游标文件名。文件存在时从文件恢复，否则新建一个保存到该文件的游标
+        :param endpoint: api_collections中search分类下的API名称
+        :param query: 除了begin和count之外的查询参数
+        :param count: 每页的数量
+        :return: :class:`PageCursor <wechat_mp.cursor.PageCursor>` 对象
+        """
+        if isinstance(cursor, str):
+            if os.path.exists(cursor):
+                cursor = cls.load(cursor)
+            else:
+                return cls(endpoint, query, count, filename=cursor, keep_items=keep_items)
+        if cursor is None:
+            return cls(endpoint, query, count, keep_items=keep_items)
+
+        if cursor.endpoint != endpoint or cursor.query != query:
+            raise ValueError(f"游标的查询条件 {cursor.endpoint} {cursor.query} 与本次查询 {endpoint} {query} 不一致")
+        if cursor.begin:
+            logger.info("从第%s条开始继续获取，已经获取了%s条", cursor.begin, cursor.fetched)
+        return cursor
+
+    @property
+    def params(self):
+        """当前页的请求参数"""
+        return dict(self.query, begin=self.begin, count=self.count)
+
+    def advance(self, page_items, page_size=None):
+        """
+        记录获取到的一页数据并移动到下一页
+
+        :param page_items: 这一页保留的数据
+        :param page_size: 这一页实际返回的数量，保留的数据比它少时只前进保留的数量
+        """
+        page_size = len(page_items) if page_size is None else page_size
+        self.fetched += len(page_items)
+        if self.keep_items:
+            self.items.extend(page_items)
+        if len(page_items) < page_size:
+            self.begin += len(page_items)
+        else:
+            self.begin += self.count
+        if not page_size or (self.total is not None and self.begin >= self.total):
+            self.finished = True
+        self.save()
+
+    def save(self):
+        """保存游标到文件"""
+        if not self.filename:
+            return
+        items_filename = self._items_filename(self.filename)
+        mode = 'a' if self._saved_count else 'w'
+        with open(items_filename, mode, encoding='utf-8') as f:
+            for item in self.items[self._saved_count:]:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        self._saved_count = len(self.items)
+
+        data = {
+            "endpoint": self.endpoint,
+            "query": self.query,
+            "count": self.count,
+            "begin": self.begin,
+            "total": self.total,
+            "fetched": self.fetched,
+            "item_count": self._saved_count,
+            "finished": self.finished,
+            "keep_items": self.keep_items,
+        }
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_filename, self.filename)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.endpoint} {self.begin}/{self.total}>"
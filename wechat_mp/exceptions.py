@@ -22,3 +22,31 @@ class ArticlesNotObtainError(Exception):
     就会触发这个异常
     """
     pass
+
+
+class EmptySessionPool(Exception):
+    """
+    session池中已经没有有效的账号时的异常
+    """
+    pass
+
+
+class UserAnalysisError(Exception):
+    """
+    用户分析数据请求失败时的异常
+
+    :param failures: 失败的(邮箱, 渠道值, 开始日期, 截止日期, base_resp)列表
+    :param result: 批量获取时其他请求成功的数据，格式与 ``fetch_user_analysis`` 的返回值相同
+    """
+
+    def __init__(self, message, failures=(), result=None):
+        super().__init__(message)
+        self.failures = list(failures)
+        self.result = result
+
+
+class RateLimitExceeded(Exception):
+    """
+    同一个请求连续被限制频率(ret 200013)超过重试次数时的异常
+    """
+    pass
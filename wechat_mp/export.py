@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: export.py
+@time: 2026/10/18 16:00
+"""
+import itertools
+import json
+import logging
+import os
+
+from wechat_mp.exceptions import ArticlesNotObtainError
+from wechat_mp.profiling import phase
+
+logger = logging.getLogger('wechat_mp')
+
+# 关键词搜索出来的图文(type=0)导出的列：(表头, 属性名)
+ARTICLE_WITH_CONTENT_COLUMNS = [
+    ("公众号名称", "nickname"),
+    ("标题", "title"),
+    ("作者", "author"),
+    ("正文", "content"),
+    ("图文地址", "url"),
+    ("封面地址", "cover_url"),
+    ("公众号头像地址", "head_img_url"),
+]
+
+# 公众号历史群发图文(type=1)导出的列：(表头, 属性名)
+ARTICLE_COLUMNS = [
+    ("标题", "title"),
+    ("摘要", "digest"),
+    ("链接", "link"),
+    ("更新时间", "update_time"),
+    ("aid", "aid"),
+    ("appmsgid", "appmsgid"),
+    ("图文序号", "itemidx"),
+]
+
+# 列式导出的字段：(字段名, 类型, 属性名)。类型为string或int64，
+# 模型对象按属性名读取，字典按字段名读取，字段名与后台返回的键相同
+ARTICLE_SCHEMA = [
+    ("aid", "string", "aid"),
+    ("appmsgid", "int64", "appmsgid"),
+    ("itemidx", "int64", "itemidx"),
+    ("title", "string", "title"),
+    ("digest", "string", "digest"),
+    ("link", "string", "link"),
+    ("cover", "string", "cover"),
+    ("update_time", "int64", "_update_time"),
+]
+
+ARTICLE_WITH_CONTENT_SCHEMA = [
+    ("nickname", "string", "nickname"),
+    ("title", "string", "title"),
+    ("author", "string", "author"),
+    ("article_type", "string", "article_type"),
+    ("content", "string", "content"),
+    ("url", "string", "url"),
+    ("cover_url", "string", "cover_url"),
+    ("head_img_url", "string", "head_img_url"),
+    ("source_url", "string", "source_url"),
+    ("source_can_reward", "int64", "source_can_reward"),
+    ("source_reprint_status", "int64", "source_reprint_status"),
+]
+
+# 用户分析的每日数据，记录是字典
+USER_ANALYSIS_SCHEMA = [
+    ("user_source", "int64", "user_source"),
+    ("date", "string", "date"),
+    ("new_user", "int64", "new_user"),
+    ("cancel_user", "int64", "cancel_user"),
+    ("netgain_user", "int64", "netgain_user"),
+    ("cumulate_user", "int64", "cumulate_user"),
+]
+
+
+def article_schema(type):
+    """
+    图文结果的列式字段
+
+    :param type: 0为关键词搜索出来的图文，1为公众号的历史群发图文
+    :return: (字段名, 类型, 属性名)列表
+    """
+    return ARTICLE_WITH_CONTENT_SCHEMA if type == 0 else ARTICLE_SCHEMA
+
+
+def _convert(value, kind):
+    if value is None or value == "":
+        return None
+    if kind == "int64":
+        return int(value)
+    return str(value)
+
+
+def to_record(obj, schema):
+    """
+    按照字段把对象或者字典转换成一行记录，对象按属性名读取，字典按字段名读取
+
+    :param obj: 模型对象或者后台返回的字典
+    :param schema: (字段名, 类型, 属性名)列表
+    :return: 字段名到值的字典
+    """
+    if isinstance(obj, dict):
+        return {name: _convert(obj.get(name), kind) for name, kind, _ in schema}
+    return {name: _convert(getattr(obj, attr, None), kind) for name, kind, attr in schema}
+
+
+def user_analysis_records(result):
+    """
+    把 ``get_user_analysis`` 的结果展开成每日记录
+
+    :param result: ``get_user_analysis`` 返回的字典，或者它们的列表
+    :return: 每日数据字典的生成器
+    """
+    if isinstance(result, dict):
+        result = [result]
+    for category in result:
+        for day in category.get('list', []):
+            yield dict(day, user_source=category.get('user_source'))
+
+
+class JsonLinesWriter:
+    """
+    逐行写入的JSON Lines文件，每条记录一行，适合作为边获取边写入的输出
+
+    :param filename: 文件名
+    :param schema: (字段名, 类型, 属性名)列表
+    """
+
+    def __init__(self, filename, schema):
+        self.filename = filename
+        self.schema = schema
+        self.count = 0
+        self._file = open(filename, 'w', encoding='utf-8')
+
+    def write(self, obj):
+        """
+        写入一条记录
+
+        :param obj: 模型对象或者字典
+        """
+        self._file.write(json.dumps(to_record(obj, self.schema), ensure_ascii=False))
+        self._file.write('\n')
+        self.count += 1
+
+    def write_many(self, objs):
+        """
+        写入多条记录
+
+        :param objs: 模型对象或者字典的可迭代对象
+        """
+        for obj in objs:
+            self.write(obj)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ArrowWriter:
+    """
+    按批写入的Parquet或者Arrow IPC文件，内存中最多保存batch_size条记录，
+    需要安装pyarrow
+
+    :param filename: 文件名
+    :param schema: (字段名, 类型, 属性名)列表
+    :param format: parquet或者arrow
+    :param batch_size: 每批写入的记录数
+    """
+
+    def __init__(self, filename, schema, format="parquet", batch_size=10000):
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("导出Parquet/Arrow需要安装pyarrow: pip install pyarrow")
+
+        self._pa = pyarrow
+        self.filename = filename
+        self.schema = schema
+        self.format = format
+        self.batch_size = batch_size
+        self.count = 0
+        self.arrow_schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind, _ in schema])
+        self._columns = {name: [] for name, _, _ in schema}
+
+        if format == "parquet":
+            import pyarrow.parquet
+            self._writer = pyarrow.parquet.ParquetWriter(filename, self.arrow_schema)
+        elif format == "arrow":
+            import pyarrow.ipc
+            self._sink = pyarrow.OSFile(filename, 'wb')
+            self._writer = pyarrow.ipc.new_file(self._sink, self.arrow_schema)
+        else:
+            raise ValueError(f"不支持的格式：{format}")
+
+    def write(self, obj):
+        """
+        写入一条记录，攒够batch_size条时写入一批
+
+        :param obj: 模型对象或者字典
+        """
+        for name, value in to_record(obj, self.schema).items():
+            self._columns[name].append(value)
+        self.count += 1
+        if len(self._columns[self.schema[0][0]]) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, objs):
+        """
+        写入多条记录
+
+        :param objs: 模型对象或者字典的可迭代对象
+        """
+        for obj in objs:
+            self.write(obj)
+
+    def flush(self):
+        """把缓存的记录作为一批写入文件"""
+        if not self._columns[self.schema[0][0]]:
+            return
+        batch = self._pa.RecordBatch.from_arrays(
+            [self._pa.array(self._columns[name], type=field.type) for name, field in
+             zip(self._columns, self.arrow_schema)],
+            schema=self.arrow_schema)
+        if self.format == "parquet":
+            self._writer.write_table(self._pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+        self._columns = {name: [] for name, _, _ in self.schema}
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self.format == "arrow":
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def save_articles_as_jsonl(articles, filename, type=None):
+    """
+    把图文逐行写入JSON Lines文件，articles可以是生成器
+
+    :param articles: 图文对象的可迭代对象
+    :param filename: 文件名
+    :param type: 0为关键词搜索出来的图文，1为公众号的历史群发图文，为None时根据第一篇图文判断
+    :return: 导出的图文数量
+    """
+    if type is None:
+        type, articles = _infer_type(articles)
+    with phase('export'), JsonLinesWriter(filename, article_schema(type)) as writer:
+        writer.write_many(articles)
+    logger.info("已导出%s篇图文到 %s", writer.count, filename)
+    return writer.count
+
+
+def save_articles_as_parquet(articles, filename, type=None, format="parquet", batch_size=10000):
+    """
+    把图文按批写入Parquet或者Arrow文件，articles可以是生成器
+
+    :param articles: 图文对象的可迭代对象
+    :param filename: 文件名
+    :param type: 0为关键词搜索出来的图文，1为公众号的历史群发图文，为None时根据第一篇图文判断
+    :param format: parquet或者arrow
+    :param batch_size: 每批写入的记录数
+    :return: 导出的图文数量
+    """
+    if type is None:
+        type, articles = _infer_type(articles)
+    with phase('export'), ArrowWriter(filename, article_schema(type), format, batch_size) as writer:
+        writer.write_many(articles)
+    logger.info("已导出%s篇图文到 %s", writer.count, filename)
+    return writer.count
+
+
+def save_user_analysis(result, filename, format="jsonl", batch_size=10000):
+    """
+    导出用户分析的每日数据
+
+    :param result: ``get_user_analysis`` 返回的字典，或者它们的列表
+    :param filename: 文件名
+    :param format: jsonl、parquet或者arrow
+    :param batch_size: 每批写入的记录数，只对parquet和arrow有效
+    :return: 导出的记录数
+    """
+    if format == "jsonl":
+        writer = JsonLinesWriter(filename, USER_ANALYSIS_SCHEMA)
+    else:
+        writer = ArrowWriter(filename, USER_ANALYSIS_SCHEMA, format, batch_size)
+    with phase('export'), writer:
+        writer.write_many(user_analysis_records(result))
+    return writer.count
+
+
+def _infer_type(articles):
+    """根据第一篇图文判断结果类型，返回类型和包含第一篇图文的迭代器"""
+    from wechat_mp.models import ArticleWithContent
+
+    articles = iter(articles)
+    first = next(articles, None)
+    if first is None:
+        return None, iter(())
+    type = 0 if isinstance(first, ArticleWithContent) else 1
+    return type, itertools.chain([first], articles)
+
+
+def _discard_workbook(wb):
+    """导出失败时关闭只写工作簿中每个工作表的临时文件并删除它们"""
+    for sheet in wb.worksheets:
+        try:
+            sheet.close()
+        finally:
+            writer = sheet._writer
+            if writer is not None and os.path.exists(writer.out):
+                writer.cleanup()
+
+
+def excel_columns(type, include_content=False):
+    """
+    导出到Excel的列
+
+    :param type: 0为关键词搜索出来的图文，1为公众号的历史群发图文
+    :param include_content: 是否包含正文，只对type=0有效
+    :return: (表头, 属性名)列表
+    """
+    if type == 0:
+        if include_content:
+            return ARTICLE_WITH_CONTENT_COLUMNS
+        return [column for column in ARTICLE_WITH_CONTENT_COLUMNS if column[1] != "content"]
+    return ARTICLE_COLUMNS
+
+
+def save_articles_as_excel(articles, filename, type=None, include_content=False):
+    """
+    使用openpyxl的只写模式逐行把图文写入Excel，内存占用不随图文数量增长。
+    articles可以是生成器，例如 ``client.iter_search_article(...)``，边获取边导出
+
+    :param articles: 图文对象的可迭代对象
+    :param filename: 文件名。默认添加了.xlsx后缀
+    :param type: 0为关键词搜索出来的图文，1为公众号的历史群发图文，为None时根据第一篇图文判断
+    :param include_content: 是否导出正文，只对type=0有效
+    :return: 导出的图文数量
+    """
+    # 先取出第一篇图文，结果为空时不创建工作簿
+    first_type, articles = _infer_type(articles)
+    if type is None:
+        type = first_type
+    if type == 0 and first_type is None:
+        raise ArticlesNotObtainError("结果为空")
+
+    if 'xlsx' not in filename:
+        filename += '.xlsx'
+
+    columns = excel_columns(type, include_content)
+    attrs = [attr for _, attr in columns]
+
+    import openpyxl
+
+    with phase('export'):
+        wb = openpyxl.Workbook(write_only=True)
+        sheet = wb.create_sheet("图文列表")
+        saved = False
+        try:
+            sheet.append([header for header, _ in columns])
+            count = 0
+            for article in articles:
+                sheet.append([getattr(article, attr) for attr in attrs])
+                count += 1
+            wb.save(filename)
+            saved = True
+        finally:
+            if not saved:
+                _discard_workbook(wb)
+    logger.info("已导出%s篇图文到 %s", count, filename)
+    return count
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: keepalive.py
+@time: 2026/10/18 17:00
+"""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger('wechat_mp')
+
+
+class SessionKeeper:
+    """
+    在后台定期访问每个账号的后台首页，保持session活跃并刷新token。
+    发现登录状态失效时立即调用on_expired提醒，并把账号从session池中移除，
+    不会等到真正请求数据时才失败或者弹出二维码
+
+    可以用 :meth:`start` 在后台线程中运行，也可以用 :meth:`run` 在事件循环中作为任务运行
+
+    :param clients: WeChat对象、SessionPool或者WeChat对象的列表
+    :param interval: 两次检查之间的秒数
+    :param on_expired: 账号登录状态失效时调用，传入失效的WeChat对象
+    """
+
+    def __init__(self, clients, interval=600, on_expired=None):
+        self.clients = clients
+        self.interval = interval
+        self.on_expired = on_expired
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _members(self):
+        """需要检查的账号，session池检查池中的每个账号"""
+        clients = getattr(self.clients, 'clients', self.clients)
+        if not isinstance(clients, (list, tuple)):
+            clients = [clients]
+        return list(clients)
+
+    def check(self):
+        """
+        检查一遍所有账号，有效的账号会刷新token和验证时间
+
+        :return: 登录状态失效的账号列表
+        """
+        expired = []
+        for client in self._members():
+            try:
+                alive = self._refresh(client)
+            except Exception:
+                logger.exception("检查账号 %s 的登录状态时出错", client.email)
+                continue
+            if not alive:
+                expired.append(client)
+                self._expire(client)
+        return expired
+
+    @staticmethod
+    def _refresh(client):
+        """访问后台首页刷新token，还没有登陆的账号先恢复保存的登陆状态"""
+        if not client._is_login and client._load_session() is None:
+            return False
+        return client._get_token(client.session)
+
+    def _expire(self, client):
+        logger.warning("账号 %s 的登录状态已失效，需要重新扫码登陆", client.email)
+        discard = getattr(self.clients, 'discard', None)
+        if discard is not None:
+            discard(client)
+        if self.on_expired is not None:
+            self.on_expired(client)
+
+    def start(self):
+        """
+        在后台线程中定期检查
+
+        :return: self
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run_thread, name='SessionKeeper', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run_thread(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        """停止后台线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def run(self, executor=None):
+        """
+        在事件循环中定期检查，检查在线程池中执行，不阻塞事件循环。
+        使用 ``asyncio.ensure_future(keeper.run())`` 创建任务，取消任务即停止
+
+        :param executor: 执行检查的线程池，默认使用事件循环的默认线程池
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            await loop.run_in_executor(executor, self.check)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self._members())} interval={self.interval}>"
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: login.py
+@time: 2026/10/18 18:00
+"""
+import asyncio
+import functools
+import logging
+import os
+import sys
+import time
+import urllib.parse
+from io import BytesIO
+
+from wechat_mp.exceptions import InvalidAccountOrPassword
+
+logger = logging.getLogger('wechat_mp')
+
+
+class FileRenderer:
+    """
+    把二维码和验证码图片保存到目录中，文件名为账号邮箱
+
+    :param directory: 保存图片的目录
+    """
+
+    def __init__(self, directory="./qrcodes"):
+        self.directory = directory
+
+    def __call__(self, client, content, kind='qrcode'):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = os.path.join(self.directory, f"{urllib.parse.quote(client.email, safe='@')}.{kind}.png")
+        with open(filename, 'wb') as f:
+            f.write(content)
+        logger.info("账号 %s 的%s已保存到 %s", client.email, "二维码" if kind == 'qrcode' else "验证码", filename)
+
+
+class TerminalRenderer:
+    """
+    在终端中用字符画出二维码，需要安装Pillow。验证码仍然保存为图片
+
+    :param stream: 输出的流
+    :param directory: 保存验证码图片的目录
+    """
+
+    def __init__(self, stream=None, directory="./qrcodes"):
+        self.stream = stream or sys.stdout
+        self._file_renderer = FileRenderer(directory)
+
+    def __call__(self, client, content, kind='qrcode'):
+        if kind != 'qrcode':
+            self._file_renderer(client, content, kind)
+            return
+        self.stream.write(f"账号 {client.email} 的登陆二维码：\n{self.to_text(content)}\n")
+        self.stream.flush()
+
+    @staticmethod
+    def to_text(content):
+        """
+        把二维码图片转换成字符，每个模块两个字符宽
+
+        :param content: 二维码图片的内容
+        :return: 字符串
+        """
+        from PIL import Image
+
+        image = Image.open(BytesIO(content)).convert('L')
+        width, height = image.size
+        pixels = image.load()
+        dark = [[pixels[x, y] < 128 for x in range(width)] for y in range(height)]
+
+        # 根据左上角定位图案的宽度(7个模块)算出每个模块的像素数
+        top = next(y for y in range(height) if any(dark[y]))
+        left = dark[top].index(True)
+        run = 0
+        while left + run < width and dark[top][left + run]:
+            run += 1
+        module = run / 7
+        size = round((width - 2 * left) / module)
+
+        lines = []
+        for row in range(size):
+            y = int(top + (row + 0.5) * module)
+            lines.append(''.join(
+                '██' if dark[y][int(left + (col + 0.5) * module)] else '  ' for col in range(size)))
+        # 四周留出空白，方便扫码
+        blank = '  ' * (size + 4)
+        return '\n'.join([blank, blank] + ['    ' + line + '    ' for line in lines] + [blank, blank])
+
+
+class LoginManager:
+    """
+    同时为多个账号扫码登陆
+
+    所有账号在同一个事件循环中登陆：阻塞的请求在线程池中执行，二维码交给renderer保存到文件或者显示在终端，
+    每个账号每隔poll_interval秒检查一次是否扫码，哪个账号先确认就先完成登陆，不需要按顺序一个一个扫码。
+    已经保存了有效登陆状态的账号不会再次扫码
+
+    :param clients: WeChat对象的列表
+    :param renderer: 显示二维码的方法，传入WeChat对象、图片内容和类型(qrcode或者captcha)，默认保存到./qrcodes
+    :param poll_interval: 检查是否扫码的间隔，秒
+    :param timeout: 每个账号等待扫码的最长秒数
+    :param executor: 执行阻塞请求的线程池，默认使用事件循环的默认线程池
+    """
+
+    def __init__(self, clients, renderer=None, poll_interval=2, timeout=300, executor=None):
+        self.clients = list(clients)
+        self.renderer = renderer or FileRenderer()
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._executor = executor
+        self._input_lock = None
+
+    async def _run(self, func, *args):
+        """在线程池中执行阻塞的请求"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def login(self):
+        """
+        同时登陆所有账号
+
+        :return: 邮箱到是否登陆成功的字典
+        """
+        self._input_lock = asyncio.Lock()
+        results = await asyncio.gather(*[self._login(client) for client in self.clients], return_exceptions=True)
+        status = {}
+        for client, result in zip(self.clients, results):
+            if isinstance(result, Exception):
+                logger.warning("账号 %s 登陆失败：%s", client.email, result)
+                result = False
+            status[client.email] = result
+        logger.info("%s个账号中%s个登陆成功", len(status), sum(status.values()))
+        return status
+
+    def run(self):
+        """
+        在新的事件循环中同时登陆所有账号，直到全部完成。已经在事件循环中时直接 ``await login()``
+
+        :return: 邮箱到是否登陆成功的字典
+        """
+        return asyncio.run(self.login())
+
+    async def _login(self, client):
+        """登陆一个账号：恢复登陆状态，或者提交密码、显示二维码并等待扫码"""
+        if client._is_login or await self._run(client._load_session):
+            return True
+
+        client.session = client._new_session()
+        img_code = ''
+        while True:
+            ret = await self._run(client._submit_login, img_code)
+            if ret == 200023:
+                raise InvalidAccountOrPassword(f"账号：{client.email} 的密码不正确")
+            if ret != 200008:
+                break
+            img_code = await self._ask_captcha(client)
+
+        if ret != 0:
+            logger.warning("账号 %s 提交登陆失败：%s", client.email, ret)
+            return False
+
+        self.renderer(client, await self._run(client._fetch_qrcode), 'qrcode')
+        return await self._wait_scan(client)
+
+    async def _ask_captcha(self, client):
+        """显示验证码并等待输入，同一时间只有一个账号从终端读取输入"""
+        self.renderer(client, await self._run(client._fetch_captcha), 'captcha')
+        async with self._input_lock:
+            return await self._run(input, f"输入账号 {client.email} 的验证码: ")
+
+    async def _wait_scan(self, client):
+        """不断地检查是否扫码，确认后立即完成登陆"""
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if await self._run(client._check_login_status) == 1:
+                await self._run(client._post_login)
+                return client._is_login
+        logger.warning("账号 %s 在%s秒内没有扫码确认", client.email, self.timeout)
+        return False
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.clients)}>"
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: metrics.py
+@time: 2026/10/18 21:00
+"""
+import bisect
+import collections
+import logging
+import threading
+
+logger = logging.getLogger('wechat_mp')
+
+# 请求耗时直方图的上界，秒
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """
+    累积直方图
+
+    :param buckets: 从小到大的上界
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """每个上界的累积数量，最后一个为+Inf"""
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        result.append(('+Inf', self.count))
+        return result
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metrics:
+    """
+    按API名称(api_collections中的名称)记录请求数、响应字节数、耗时直方图、base_resp.ret和频率限制次数，
+    可以用 :meth:`render` 输出Prometheus文本格式，或者用 :meth:`serve` 在本地端口上提供
+
+    :param buckets: 耗时直方图的上界，秒
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.errors = collections.Counter()
+        self.bytes = collections.Counter()
+        self.rets = collections.Counter()
+        self.throttles = collections.Counter()
+        self.latency = {}
+
+    def observe(self, endpoint, seconds, status=None, size=0):
+        """
+        记录一次完成的请求
+
+        :param endpoint: API名称
+        :param seconds: 耗时
+        :param status: HTTP状态码
+        :param size: 响应字节数
+        """
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+            self.bytes[endpoint] += size
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def error(self, endpoint, exc):
+        """记录一次没有得到响应的请求"""
+        with self._lock:
+            self.errors[(endpoint, type(exc).__name__)] += 1
+
+    def ret(self, endpoint, ret):
+        """记录响应中的base_resp.ret，200013同时记录为一次频率限制"""
+        with self._lock:
+            self.rets[(endpoint, ret)] += 1
+            if ret == 200013:
+                self.throttles[endpoint] += 1
+
+    def snapshot(self):
+        """
+        当前的统计
+
+        :return: API名称到统计字典的字典
+        """
+        with self._lock:
+            result = {}
+            for endpoint, histogram in self.latency.items():
+                result[endpoint] = {
+                    'requests': histogram.count,
+                    'bytes': self.bytes[endpoint],
+                    'seconds': histogram.sum,
+                    'mean_seconds': histogram.sum / histogram.count if histogram.count else 0,
+                    'throttled': self.throttles[endpoint],
+                    'rets': {ret: count for (name, ret), count in self.rets.items() if name == endpoint},
+                }
+            return result
+
+    def render(self):
+        """
+        Prometheus文本格式
+
+        :return: 字符串
+        """
+        lines = []
+        with self._lock:
+            lines += ['# HELP wechat_mp_requests_total 完成的请求数',
+                      '# TYPE wechat_mp_requests_total counter']
+            lines += [f'wechat_mp_requests_total{_labels(endpoint=endpoint, status=status)} {count}'
+                      for (endpoint, status), count in sorted(self.requests.items(), key=str)]
+            lines += ['# HELP wechat_mp_request_errors_total 没有得到响应的请求数',
+                      '# TYPE wechat_mp_request_errors_total counter']
+            lines += [f'wechat_mp_request_errors_total{_labels(endpoint=endpoint, error=error)} {count}'
+                      for (endpoint, error), count in sorted(self.errors.items())]
+            lines += ['# HELP wechat_mp_response_bytes_total 响应的字节数',
+                      '# TYPE wechat_mp_response_bytes_total counter']
+            lines += [f'wechat_mp_response_bytes_total{_labels(endpoint=endpoint)} {count}'
+                      for endpoint, count in sorted(self.bytes.items())]
+            lines += ['# HELP wechat_mp_ret_total 响应中base_resp.ret的次数',
+                      '# TYPE wechat_mp_ret_total counter']
+            lines += [f'wechat_mp_ret_total{_labels(endpoint=endpoint, ret=ret)} {count}'
+                      for (endpoint, ret), count in sorted(self.rets.items(), key=str)]
+            lines += ['# HELP wechat_mp_throttled_total 被限制频率(ret 200013)的次数',
+                      '# TYPE wechat_mp_throttled_total counter']
+            lines += [f'wechat_mp_throttled_total{_labels(endpoint=endpoint)} {count}'
+                      for endpoint, count in sorted(self.throttles.items())]
+            lines += ['# HELP wechat_mp_request_duration_seconds 请求耗时',
+                      '# TYPE wechat_mp_request_duration_seconds histogram']
+            for endpoint, histogram in sorted(self.latency.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f'wechat_mp_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} '
+                                 f'{count}')
+                lines.append(f'wechat_mp_request_duration_seconds_sum{_labels(endpoint=endpoint)} {histogram.sum}')
+                lines.append(f'wechat_mp_request_duration_seconds_count{_labels(endpoint=endpoint)} '
+                             f'{histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port=9108, host='127.0.0.1'):
+        """
+        在后台线程中启动HTTP服务，任意路径都返回Prometheus文本格式的统计
+
+        :param port: 端口，0表示随机端口
+        :param host: 监听的地址
+        :return: HTTPServer，调用shutdown()停止
+        """
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from socketserver import ThreadingMixIn
+
+        class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True).start()
+        logger.info("请求统计地址 http://%s:%s/metrics", host, server.server_address[1])
+        return server
+
+    def clear(self):
+        """清空统计"""
+        with self._lock:
+            for counter in (self.requests, self.errors, self.bytes, self.rets, self.throttles):
+                counter.clear()
+            self.latency.clear()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {sum(h.count for h in self.latency.values())}>"
+
+
+# 没有单独设置时，所有客户端共用的统计
+DEFAULT_METRICS = Metrics()
@@ -8,13 +8,11 @@
 @time: 2018/9/8 11:16
 """
 import logging
-import random
-import time
+from array import array
 
-import openpyxl
-from tqdm import tqdm
-
-from wechat_mp.exceptions import ArticlesNotObtainError
+from wechat_mp.cursor import PageCursor
+from wechat_mp.export import save_articles_as_excel, save_articles_as_jsonl, save_articles_as_parquet
+from wechat_mp.profiling import phase
 from wechat_mp.utils import from_timestamp_to_datetime_string
 
 
@@ -27,6 +25,8 @@ class OfficalAccount:
 
     """
 
+    __slots__ = ('client', 'fakeid', 'nickname', 'alias', 'round_head_img', 'service_type')
+
     def __init__(self, raw_dict, client):
         self.client = client
         self.fakeid = raw_dict.get('fakeid')
@@ -35,7 +35,7 @@ class OfficalAccount:
         self.round_head_img = raw_dict.get('round_head_img')
         self.service_type = raw_dict.get('service_type')
 
-    def articles(self, title_contain="", limit=0, interval=3):
+    def articles(self, title_contain="", limit=0, interval=None, cursor=None, workers=1):
         """
         获取公众号的历史群发图文
 
@@ -43,71 +43,93 @@ class OfficalAccount:
         :type title_contain: str
         :param limit: 限制获取的图文数量
         :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，传入中断时的游标可以从中断的那一页继续获取
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :param workers: 并发请求的线程数，大于1时获取第一页得到总数后，其余的页并发获取，仍然受限速器限制
+        :type workers: int
         :return: :class:`Article <wechat_mp.models.Article>` 对象列表
         """
-        search_api = self.client.api_collections('search', 'article list').format(self.client.token,
-                                                                                  random.randint(200, 999))
-
-        params = {
-            'begin': 0,
-            'count': 5,
-            'query': title_contain,
-            'fakeid': self.fakeid
-        }
+        cursor = PageCursor.prepare(cursor, 'article list', {'query': title_contain, 'fakeid': self.fakeid}, 5)
+        article_list = self.client._collect(cursor, self._search_article_pages, limit, interval, "篇图文", workers)
+        with phase('model'):
+            return ArticleSearchResult([Article(article) for article in article_list], type=1)
 
-        response = self.client.session.get(search_api, params=params).json()
-        article_list = []
-        begin = 0
+    def iter_articles(self, title_contain="", limit=0, interval=None, cursor=None):
+        """
+        逐篇返回公众号的历史群发图文，每获取一页就立即返回这一页的图文，
+        停止迭代后不再发出请求，内存中最多只保存一页数据
 
-        total = response.get('app_msg_cnt')
+        :param title_contain: 图文标题包含的字符串
+        :type title_contain: str
+        :param limit: 限制获取的图文数量
+        :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :param cursor: 分页游标或者游标文件名，游标只记录位置，不保存数据
+        :type cursor: :class:`PageCursor <wechat_mp.cursor.PageCursor>` or str
+        :return: :class:`Article <wechat_mp.models.Article>` 对象的生成器
+        """
+        cursor = PageCursor.prepare(cursor, 'article list', {'query': title_contain, 'fakeid': self.fakeid}, 5,
+                                    keep_items=False)
+        for page_items in self.client._paginate(cursor, self._search_article_pages, limit, interval):
+            with phase('model'):
+                articles = [Article(article) for article in page_items]
+            yield from articles
+
+    def sync_articles(self, store, limit=0, interval=None):
+        """
+        增量同步公众号的历史群发图文，从最新的图文开始获取，
+        遇到已经同步过的图文就停止分页，只返回上次同步之后新发的图文
 
-        if limit == 0:
-            logger.info("该公众号共有%s篇图文,已设置不限制获取数量", total)
-            bar = tqdm(total=total)
-            limit = total
-        else:
-            logger.info("该公众号共有%s篇图文,已设置限制获取前%s篇图文", total, limit)
-            bar = tqdm(total=limit)
-
-        bar.set_description("进度条")
-        reach_limit = False
-
-        while not reach_limit:
-
-            page_result = self._search_article_pages(search_api, params)
-            print(len(page_result))
-            if not page_result:
-                reach_limit = True
-
-            for article in page_result:
-                if len(article_list) >= limit or len(article_list) > total:
-                    reach_limit = True
-                else:
-                    article_list.append(article)
-                    bar.update(1)
-            begin += 5
-            params['begin'] = begin
-            time.sleep(interval)
-
-        article_result = ArticleSearchResult([Article(article) for article in article_list], type=1)
-        bar.close()
-        return article_result
-
-    def _search_article_pages(self, search_api, params):
+        第一次同步时没有记录，会获取全部历史图文(或者前limit篇)
+
+        只有遇到已经同步过的图文，或者没有出错也没有被limit截断地获取完所有图文时才更新同步进度，
+        否则保留原来的进度，下次同步会重新获取这次返回的图文，不会漏掉还没有获取的图文
+
+        :param store: 记录同步进度的对象
+        :type store: :class:`ArticleSyncStore <wechat_mp.store.ArticleSyncStore>`
+        :param limit: 限制获取的图文数量
+        :type limit: int
+        :param interval: 固定的请求时间间隔，秒。默认为None，由限速器根据频率限制自动调节
+        :type interval: int
+        :return: :class:`ArticleSearchResult <wechat_mp.models.ArticleSearchResult>` 对象
+        """
+        synced = store.get(self.fakeid)
+        cursor = PageCursor.prepare(None, 'article list', {'query': "", 'fakeid': self.fakeid}, 5, keep_items=False)
+        newest = None
+        caught_up = False
+        article_list = []
+        for page_items in self.client._paginate(cursor, self._search_article_pages, limit, interval):
+            for article in page_items:
+                article = Article(article)
+                position = (int(article._update_time), int(article.appmsgid))
+                if synced and position <= (synced['update_time'], synced['appmsgid']):
+                    caught_up = True
+                    break
+                if newest is None or position > newest:
+                    newest = position
+                article_list.append(article)
+            if caught_up:
+                break
+
+        logger.info("公众号 %s 有%s篇新图文", self.nickname, len(article_list))
+        if not (caught_up or cursor.finished):
+            logger.warning("公众号 %s 没有获取到上次同步的位置，不更新同步进度", self.nickname)
+        elif newest is not None:
+            store.update(self.fakeid, *newest)
+        return ArticleSearchResult(article_list, type=1)
+
+    def _search_article_pages(self, params, interval=None):
         """
         根据页数不断地进行请求
 
-        :param api: 请求的API
         :param params: 包含起始的参数
-        :return: 文章字典列表
+        :param interval: 固定的请求时间间隔，秒
+        :return: 响应字典
         """
-        articles = []
-        response = self.client.session.get(search_api, params=params).json()
-
-        if response['base_resp']['ret'] == 0:
-            app_msg_list = response.get('app_msg_list')
-            articles += app_msg_list
-        return articles
+        return self.client._request_page('article list', params, interval)
 
     def __str__(self):
         return f"<{self.__class__.__name__}: {self.nickname}>"
@@ -121,6 +143,8 @@ class Article:
     微信图文对象
     """
 
+    __slots__ = ('aid', 'appmsgid', 'cover', 'digest', 'itemidx', 'link', 'title', '_update_time')
+
     def __init__(self, raw_dict):
         self.aid = raw_dict.get('aid')
         self.appmsgid = raw_dict.get('appmsgid')
@@ -154,6 +178,9 @@ class ArticleWithContent:
     具有更多的图文属性
     """
 
+    __slots__ = ('article_type', 'author', 'content', 'cover_url', 'head_img_url', 'nickname', 'source_can_reward',
+                 'source_reprint_status', 'source_url', 'title', 'url')
+
     def __init__(self, raw_dict):
         self.article_type = raw_dict.get("article_type")
         self.author = raw_dict.get("author")
@@ -174,12 +201,148 @@ class ArticleWithContent:
         return f"<{self.__class__.__name__}: {self.title}>"
 
 
+class StringColumn:
+    """
+    按列保存的一列字符串，所有值以UTF-8编码依次保存在同一个bytearray中，另外用整数数组记录每个值的结束位置，
+    不再为每个值单独保存一个str对象。None单独记录行号，读取时解码出新的str对象
+    """
+
+    def __init__(self):
+        self._data = bytearray()
+        self._ends = array('q')
+        self._none = set()
+
+    def append(self, value):
+        if value is None:
+            self._none.add(len(self._ends))
+        else:
+            self._data += str(value).encode('utf-8')
+        self._ends.append(len(self._data))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._ends)
+        end = self._ends[index]
+        if index in self._none:
+            return None
+        start = self._ends[index - 1] if index else 0
+        return self._data[start:end].decode('utf-8')
+
+    def __len__(self):
+        return len(self._ends)
+
+
+class ArticleTable:
+    """
+    按列保存的公众号历史群发图文，用于在内存中保存大量的图文
+
+    appmsgid、itemidx和update_time保存在整数数组中，标题、摘要、链接和封面分别保存在 :class:`StringColumn` 中，
+    aid通常就是 ``appmsgid_itemidx``，只有不符合这个格式的aid才单独保存。
+    按下标或者迭代访问时才创建 :class:`Article <wechat_mp.models.Article>` 对象。
+
+    ``python tests/benchmark.py --only memory --articles 200000`` 用tracemalloc测量：
+    20万篇FakeBackend生成的图文，带__slots__的Article对象列表约137MB，ArticleTable约56MB
+    """
+
+    _string_columns = ('cover', 'digest', 'link', 'title')
+
+    def __init__(self, articles=()):
+        self.appmsgid = array('q')
+        self.itemidx = array('q')
+        self.update_time = array('q')
+        self.cover = StringColumn()
+        self.digest = StringColumn()
+        self.link = StringColumn()
+        self.title = StringColumn()
+        # 不是appmsgid_itemidx格式的aid，行号到aid
+        self._aids = {}
+        self.extend(articles)
+
+    def append(self, article):
+        """
+        添加一篇图文
+
+        :param article: 图文字典或者 :class:`Article <wechat_mp.models.Article>` 对象
+        """
+        if isinstance(article, Article):
+            raw = {name: getattr(article, name) for name in Article.__slots__ if name != '_update_time'}
+            raw['update_time'] = article._update_time
+            article = raw
+        appmsgid = int(article.get('appmsgid') or 0)
+        itemidx = int(article.get('itemidx') or 0)
+        aid = article.get('aid')
+        if aid != f"{appmsgid}_{itemidx}":
+            self._aids[len(self.appmsgid)] = aid
+        self.appmsgid.append(appmsgid)
+        self.itemidx.append(itemidx)
+        self.update_time.append(int(article.get('update_time') or 0))
+        for name in self._string_columns:
+            getattr(self, name).append(article.get(name))
+
+    def extend(self, articles):
+        """
+        添加多篇图文
+
+        :param articles: 图文字典或者Article对象的可迭代对象
+        """
+        for article in articles:
+            self.append(article)
+
+    def row(self, index):
+        """
+        读取一行原始数据
+
+        :param index: 行号
+        :return: 图文字典
+        """
+        if index < 0:
+            index += len(self)
+        appmsgid = self.appmsgid[index]
+        itemidx = self.itemidx[index]
+        return {
+            'aid': self._aids.get(index, f"{appmsgid}_{itemidx}"),
+            'appmsgid': appmsgid,
+            'itemidx': itemidx,
+            'update_time': self.update_time[index],
+            'cover': self.cover[index],
+            'digest': self.digest[index],
+            'link': self.link[index],
+            'title': self.title[index],
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Article(self.row(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Article(self.row(index))
+
+    def __len__(self):
+        return len(self.appmsgid)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self)}>"
+
+
 class ArticleSearchResult:
 
     def __init__(self, article_list, type):
         self.article_list = article_list
         self.type = type
 
+    def compact(self):
+        """
+        把公众号历史群发图文(type=1)换成按列保存的 :class:`ArticleTable <wechat_mp.models.ArticleTable>`，
+        大幅减少内存占用，其他用法不变
+
+        :return: 结果对象本身
+        """
+        if self.type == 1 and not isinstance(self.article_list, ArticleTable):
+            self.article_list = ArticleTable(self.article_list)
+        return self
+
     @property
     def total(self):
         return len(self.article_list)
@@ -189,89 +352,30 @@ class ArticleSearchResult:
         将该公众号搜索出来的历史群发图文保存到Excel中
 
         :param filename: 文件名。默认添加了.xlsx后缀
+        :param include_content: 是否导出正文，只对关键词搜索出来的图文有效
+        :return: None
+        """
+        save_articles_as_excel(self.article_list, filename, type=self.type, include_content=include_content)
+
+    def save_articles_as_jsonl(self, filename):
+        """
+        将图文逐行保存到JSON Lines文件中
+
+        :param filename: 文件名
         :return: None
         """
+        save_articles_as_jsonl(self.article_list, filename, type=self.type)
 
-        if self.type == 0:
-            if not self.article_list:
-                raise ArticlesNotObtainError(f"结果为空")
-
-            def write_header(sheet):
-                if include_content:
-                    sheet.cell(1, 1, value="公众号名称")
-                    sheet.cell(1, 2, value="标题")
-                    sheet.cell(1, 3, value="作者")
-                    sheet.cell(1, 4, value="正文")
-                    sheet.cell(1, 5, value="图文地址")
-                    sheet.cell(1, 6, value="封面地址")
-                    sheet.cell(1, 7, value="公众号头像地址")
-                else:
-                    sheet.cell(1, 1, value="公众号名称")
-                    sheet.cell(1, 2, value="标题")
-                    sheet.cell(1, 3, value="作者")
-                    sheet.cell(1, 4, value="图文地址")
-                    sheet.cell(1, 5, value="封面地址")
-                    sheet.cell(1, 6, value="公众号头像地址")
-
-                return sheet
-
-            if 'xlsx' not in filename:
-                filename += '.xlsx'
-            wb = openpyxl.Workbook()
-            wb.save(filename)
-            wb = openpyxl.load_workbook(filename)
-            sheet = wb[wb.sheetnames[0]]
-            sheet.title = "图文列表"
-            sheet = write_header(sheet)
-
-            for index, article in enumerate(self.article_list, 2):
-                if include_content:
-                    sheet.cell(index, 1, value=article.nickname)
-                    sheet.cell(index, 2, value=article.title)
-                    sheet.cell(index, 3, value=article.author)
-                    sheet.cell(index, 4, value=article.content)
-                    sheet.cell(index, 5, value=article.url)
-                    sheet.cell(index, 6, value=article.cover_url)
-                    sheet.cell(index, 7, value=article.head_img_url)
-                else:
-                    sheet.cell(index, 1, value=article.nickname)
-                    sheet.cell(index, 2, value=article.title)
-                    sheet.cell(index, 3, value=article.author)
-                    sheet.cell(index, 4, value=article.url)
-                    sheet.cell(index, 5, value=article.cover_url)
-                    sheet.cell(index, 6, value=article.head_img_url)
-
-            wb.save(filename)
-        elif self.type == 1:
-            def write_header(sheet):
-                sheet.cell(1, 1, value="标题")
-                sheet.cell(1, 2, value="摘要")
-                sheet.cell(1, 3, value="链接")
-                sheet.cell(1, 4, value="更新时间")
-                sheet.cell(1, 5, value="aid")
-                sheet.cell(1, 6, value="appmsgid")
-                sheet.cell(1, 7, value="图文序号")
-                return sheet
-
-            if 'xlsx' not in filename:
-                filename += '.xlsx'
-            wb = openpyxl.Workbook()
-            wb.save(filename)
-            wb = openpyxl.load_workbook(filename)
-            sheet = wb[wb.sheetnames[0]]
-            sheet.title = "图文列表"
-            sheet = write_header(sheet)
-
-            for index, article in enumerate(self.article_list, 2):
-                sheet.cell(index, 1, value=article.title)
-                sheet.cell(index, 2, value=article.digest)
-                sheet.cell(index, 3, value=article.link)
-                sheet.cell(index, 4, value=article.update_time)
-                sheet.cell(index, 5, value=article.aid)
-                sheet.cell(index, 6, value=article.appmsgid)
-                sheet.cell(index, 7, value=article.itemidx)
-
-            wb.save(filename)
+    def save_articles_as_parquet(self, filename, format="parquet", batch_size=10000):
+        """
+        将图文按批保存到Parquet或者Arrow文件中，需要安装pyarrow
+
+        :param filename: 文件名
+        :param format: parquet或者arrow
+        :param batch_size: 每批写入的记录数
+        :return: None
+        """
+        save_articles_as_parquet(self.article_list, filename, type=self.type, format=format, batch_size=batch_size)
 
     def __getitem__(self, item):
         if isinstance(item, int):
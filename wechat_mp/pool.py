@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: pool.py
+@time: 2026/10/18 11:00
+"""
+import logging
+import os
+import threading
+import time
+
+from wechat_mp.client import WeChat
+from wechat_mp.exceptions import EmptySessionPool, InvalidAccountOrPassword
+from wechat_mp.ratelimit import RateLimiter
+from wechat_mp.store import SessionStore
+
+logger = logging.getLogger('wechat_mp')
+
+
+class SessionPool(WeChat):
+    """
+    多账号的session池，加载保存了登陆状态的所有仍然有效的账号，
+    把 ``search_account``、``search_article`` 和 ``OfficalAccount.articles`` 的每一页请求
+    分发给最久没有被限制频率的账号，总的请求速度随账号数量线性增长
+
+    :param session_store: 保存登陆状态的对象，默认为./sessions目录
+    :type session_store: :class:`SessionStore <wechat_mp.store.SessionStore>`
+    :param rate_limiter: 整个session池共用的限速器，只有所有账号都被限制时才会退避，
+        默认把学习到的速率保存在session目录旁边的ratelimit.json中
+    :type rate_limiter: :class:`RateLimiter <wechat_mp.ratelimit.RateLimiter>`
+    :param cache: 分页响应缓存，默认不缓存
+    :type cache: :class:`ResponseCache <wechat_mp.cache.ResponseCache>`
+    :param token_ttl: 保存的token在验证后多少秒内直接使用，不再请求首页验证
+    :type token_ttl: int
+    :param adapter: 挂载到后台地址上的requests transport adapter
+    :type adapter: :class:`requests.adapters.BaseAdapter`
+    :param transport: 所有账号共用的HTTP连接池，默认为 ``DEFAULT_TRANSPORT``
+    :type transport: :class:`Transport <wechat_mp.transport.Transport>`
+    """
+
+    def __init__(self, session_store=None, rate_limiter=None, cache=None, token_ttl=1800, adapter=None,
+                 transport=None):
+        super().__init__(None, None, rate_limiter=rate_limiter, cache=cache,
+                         session_store=session_store or SessionStore(), token_ttl=token_ttl, adapter=adapter,
+                         transport=transport)
+        self._lock = threading.Lock()
+        if not self.session_store.emails():
+            self.session_store.import_pickle()
+
+        self.clients = []
+        for email in self.session_store.emails():
+            client = WeChat.from_account(self.session_store.load(email), token_ttl, adapter, self.transport)
+            if client:
+                self.clients.append(client)
+            else:
+                logger.warning("账号 %s 的登录状态已失效，不加入session池", email)
+
+        if not self.clients:
+            raise ValueError(f"{self.session_store.directory} 中没有有效的登录账号")
+        logger.info("session池共加载%s个有效账号", len(self.clients))
+        # 初始速率和速率上限都按账号数量放大，学习到的速率保存在session目录旁边的ratelimit.json中
+        if rate_limiter is None:
+            filename = os.path.join(os.path.dirname(os.path.abspath(self.session_store.directory)), 'ratelimit.json')
+            self.rate_limiter = RateLimiter(filename, namespace='pool', rate=len(self.clients) / 3,
+                                            max_rate=2 * len(self.clients))
+
+        # 每个账号最近一次被限制频率和最近一次使用的时间
+        self._throttled_at = {client.email: 0 for client in self.clients}
+        self._used_at = {client.email: 0 for client in self.clients}
+
+        # 不分页的接口，例如用户分析，仍然使用第一个账号
+        self._is_login = True
+        self.session = self.clients[0].session
+        self.token = self.clients[0].token
+
+    def _ensure_login(self):
+        """session池中的账号都已经登陆，所有账号都被移出后不能再发出请求"""
+        if not self.clients:
+            raise EmptySessionPool("session池中已经没有有效的账号")
+
+    def _acquire(self, exclude=()):
+        """选出最久没有被限制频率的账号，相同时选择最久没有使用的账号"""
+        with self._lock:
+            candidates = [client for client in self.clients if client.email not in exclude]
+            if not candidates:
+                return None
+            client = min(candidates, key=lambda c: (self._throttled_at[c.email], self._used_at[c.email]))
+            self._used_at[client.email] = time.time()
+            return client
+
+    def mark_throttled(self, client):
+        """
+        记录账号被限制了请求频率
+
+        :param client: 被限制的账号
+        """
+        with self._lock:
+            self._throttled_at[client.email] = time.time()
+        logger.warning("账号 %s 请求频率出现限制，切换到其他账号", client.email)
+
+    def discard(self, client):
+        """
+        把登录状态失效的账号移出session池，之后的请求不再分发给它
+
+        :param client: 失效的账号
+        """
+        with self._lock:
+            if client not in self.clients:
+                return
+            self.clients.remove(client)
+            if self.clients and self.session is client.session:
+                self.session = self.clients[0].session
+                self.token = self.clients[0].token
+        logger.warning("账号 %s 已移出session池，剩余%s个账号", client.email, len(self.clients))
+
+    def _send_page(self, path, params):
+        """
+        把一页请求分发给最久没有被限制的账号，
+        如果被限制了就换下一个账号重试，所有账号都被限制时返回最后一次的响应。
+        登录状态失效并且无法刷新token的账号移出session池，由下一个账号重试这一页，
+        所有账号都已经被移出时抛出 :class:`EmptySessionPool <wechat_mp.exceptions.EmptySessionPool>`
+
+        :param path: api_collections中search分类下的API名称
+        :param params: 分页参数，不需要包含token
+        :return: 响应字典
+        """
+        tried = set()
+        throttled = None
+        while True:
+            client = self._acquire(exclude=tried)
+            if client is None:
+                if throttled is None:
+                    raise EmptySessionPool("session池中已经没有有效的账号")
+                return throttled
+            try:
+                response = client._send_page(path, params)
+            except InvalidAccountOrPassword as e:
+                # 之前已经失效的账号没有密码，不能重新登陆
+                logger.warning("%s", e)
+                self.discard(client)
+                continue
+            ret = response['base_resp']['ret']
+            if ret in self._invalid_session_rets:
+                # 账号自己已经尝试过刷新token，仍然失效
+                self.discard(client)
+                continue
+            if ret != 200013:
+                return response
+            throttled = response
+            self.mark_throttled(client)
+            tried.add(client.email)
+
+    def _send_with_token(self, send, *args):
+        """
+        不分页的请求使用当前账号发出，发现token失效时刷新这个账号的token后重试一次，
+        刷新失败时把它移出session池并换下一个账号重试。所有账号都已经被移出时抛出
+        :class:`EmptySessionPool <wechat_mp.exceptions.EmptySessionPool>`
+
+        :param send: 发出一次请求的方法，返回响应字典
+        :return: 响应字典
+        """
+        while True:
+            self._ensure_login()
+            token = self.token
+            response = send(*args)
+            base_resp = response.get('base_resp') if isinstance(response, dict) else None
+            if not base_resp or base_resp.get('ret') not in self._invalid_session_rets:
+                return response
+            with self._login_lock:
+                if self.token != token:
+                    # 其他线程已经刷新了token或者换了账号
+                    continue
+                client = next((c for c in list(self.clients) if c.session is self.session), None)
+                if client is None or not client._refresh_token(token):
+                    if client is not None:
+                        self.discard(client)
+                    continue
+                self.token = client.token
+            return send(*args)
+
+    def _dump_session(self):
+        """session池只读取账号，不改写保存的登陆状态"""
+        return
+
+    def _delete_session(self):
+        """session池不删除保存的登陆状态，失效的账号只移出session池"""
+        return
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self.clients)}>"
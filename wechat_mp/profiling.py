@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: profiling.py
+@time: 2026/10/18 22:00
+"""
+import collections
+import contextlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger('wechat_mp')
+
+# 报告中阶段的顺序和说明
+PHASES = collections.OrderedDict([
+    ('network', "HTTP请求"),
+    ('sleep', "限速等待"),
+    ('parse', "JSON/页面解析"),
+    ('model', "创建模型对象"),
+    ('export', "导出文件"),
+])
+
+# 正在记录的Profiler，没有时phase几乎没有开销
+_profilers = []
+_local = threading.local()
+
+
+def _add(name, seconds, calls):
+    for profiler in list(_profilers):
+        profiler.add(name, seconds, calls)
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    把代码块的耗时记录到所有正在记录的Profiler的name阶段。
+
+    同一个线程中嵌套的阶段只记录自己的时间，例如导出时从生成器获取图文，
+    请求的时间记录为network，不会重复记录为export
+
+    :param name: 阶段名称，见 ``PHASES``
+    """
+    if not _profilers:
+        yield
+        return
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    now = time.perf_counter()
+    if stack:
+        parent = stack[-1]
+        _add(parent[0], now - parent[1], 0)
+    frame = [name, now]
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        stack.pop()
+        _add(name, now - frame[1], 1)
+        if stack:
+            stack[-1][1] = now
+
+
+def record(name, seconds):
+    """
+    直接记录一段已知的耗时，用于事件循环中的等待，它们不能使用按线程嵌套的 :func:`phase`
+
+    :param name: 阶段名称
+    :param seconds: 秒数
+    """
+    if _profilers:
+        _add(name, seconds, 1)
+
+
+class Profiler:
+    """
+    记录一次运行中各个阶段的耗时：HTTP请求、限速等待、JSON和页面解析、创建模型对象和导出文件，
+    退出时在日志中输出报告。也可以同时用cProfile记录，保存的文件可以用snakeviz或者flameprof查看
+
+    多个线程并发请求时，各阶段的时间是所有线程的合计，可能超过总耗时。
+    cProfile只记录进入Profiler的线程
+
+    :param cprofile: cProfile统计保存的文件名，为None时不使用cProfile
+    :param log: 退出时是否在日志中输出报告
+    """
+
+    def __init__(self, cprofile=None, log=True):
+        self.cprofile = cprofile
+        self.log = log
+        self.seconds = collections.Counter()
+        self.calls = collections.Counter()
+        self.wall = 0.0
+        self._lock = threading.Lock()
+        self._start = None
+        self._profile = None
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            self.seconds[name] += seconds
+            self.calls[name] += calls
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        _profilers.append(self)
+        if self.cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.cprofile)
+            logger.info("cProfile统计已保存到 %s", self.cprofile)
+            self._profile = None
+        _profilers.remove(self)
+        self.wall += time.perf_counter() - self._start
+        if self.log:
+            logger.info("各阶段耗时：\n%s", self.report())
+
+    def breakdown(self):
+        """
+        各阶段的耗时
+
+        :return: 阶段名称到(秒数, 次数)的字典，other为总耗时中没有归入任何阶段的部分
+        """
+        with self._lock:
+            names = list(PHASES) + sorted(set(self.seconds) - set(PHASES))
+            result = collections.OrderedDict((name, (self.seconds[name], self.calls[name]))
+                                             for name in names if name in self.seconds)
+            result['other'] = (max(self.wall - sum(self.seconds.values()), 0.0), 0)
+        return result
+
+    def report(self):
+        """
+        文本格式的报告
+
+        :return: 字符串
+        """
+        lines = [f"{'阶段':<10}{'秒':>10}{'占比':>8}{'次数':>8}"]
+        for name, (seconds, calls) in self.breakdown().items():
+            share = seconds / self.wall * 100 if self.wall else 0
+            lines.append(f"{name:<10}{seconds:>10.3f}{share:>7.1f}%{calls:>8}  {PHASES.get(name, '')}")
+        lines.append(f"{'wall':<10}{self.wall:>10.3f}")
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.wall:.3f}s>"
+
+
+def profile(cprofile=None, log=True):
+    """
+    ``with profile(): ...`` 记录代码块中各阶段的耗时，见 :class:`Profiler`
+
+    :param cprofile: cProfile统计保存的文件名
+    :param log: 退出时是否在日志中输出报告
+    :return: :class:`Profiler <wechat_mp.profiling.Profiler>` 对象
+    """
+    return Profiler(cprofile, log)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: ratelimit.py
+@time: 2026/10/18 12:00
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from wechat_mp.profiling import phase
+
+logger = logging.getLogger('wechat_mp')
+
+
+class TokenBucket:
+    """
+    单个API的令牌桶
+
+    :param rate: 每秒允许的请求数
+    :param capacity: 桶的容量，即允许的突发请求数
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        # 被限制频率后，在这个时间之前不再发出请求
+        self.blocked_until = 0
+        self.throttle_count = 0
+        self.success_count = 0
+
+    def reserve(self, interval=None):
+        """
+        预约一个令牌
+
+        :param interval: 固定的请求间隔，设置后不再使用学习到的速率
+        :return: 需要等待的秒数
+        """
+        now = time.monotonic()
+        rate = 1 / interval if interval else self.rate
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+        self.tokens -= 1
+        wait = -self.tokens / rate if self.tokens < 0 else 0
+        return max(wait, self.blocked_until - now)
+
+
+class RateLimiter:
+    """
+    按API名称区分的自适应限速器
+
+    每个API(api_collections中的名称)有一个令牌桶，请求成功时缓慢提高速率，
+    被限制频率(ret 200013)时速率减半并按指数退避，从而学习到可持续的请求速率。
+    设置了filename时，学习到的速率会保存下来，下次运行直接使用。
+
+    :param filename: 保存学习到的速率的json文件，为None时不保存
+    :param namespace: 在文件中区分不同账号的名称
+    :param rate: 初始速率，每秒请求数
+    :param min_rate: 最低速率
+    :param max_rate: 最高速率
+    :param increase: 每次请求成功时增加的速率
+    :param backoff: 第一次被限制时的退避秒数，之后每次翻倍
+    :param max_backoff: 最长的退避秒数
+    """
+
+    def __init__(self, filename=None, namespace='default', rate=1 / 3, min_rate=1 / 120, max_rate=2,
+                 increase=0.02, backoff=5, max_backoff=300):
+        self.filename = filename
+        self.namespace = namespace or 'default'
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._learned = self._load()
+
+    def _bucket(self, endpoint):
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = TokenBucket(self._learned.get(endpoint, self.rate))
+            self._buckets[endpoint] = bucket
+        return bucket
+
+    def rate_of(self, endpoint):
+        """
+        当前的速率
+
+        :param endpoint: API名称
+        :return: 每秒请求数
+        """
+        with self._lock:
+            return self._bucket(endpoint).rate
+
+    def reserve(self, endpoint, interval=None):
+        """
+        预约一次请求，返回需要等待的秒数，异步客户端用它配合asyncio.sleep
+
+        :param endpoint: API名称
+        :param interval: 固定的请求间隔，秒
+        :return: 需要等待的秒数
+        """
+        with self._lock:
+            return self._bucket(endpoint).reserve(interval)
+
+    def acquire(self, endpoint, interval=None):
+        """
+        阻塞直到可以发出请求
+
+        :param endpoint: API名称
+        :param interval: 固定的请求间隔，秒
+        """
+        wait = self.reserve(endpoint, interval)
+        if wait > 0:
+            with phase('sleep'):
+                time.sleep(wait)
+
+    def succeeded(self, endpoint):
+        """
+        记录一次成功的请求，线性提高速率
+
+        :param endpoint: API名称
+        """
+        with self._lock:
+            bucket = self._bucket(endpoint)
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+            bucket.throttle_count = 0
+            bucket.success_count += 1
+            save = bucket.success_count % 20 == 0
+        if save:
+            self.save()
+
+    def throttled(self, endpoint):
+        """
+        记录一次频率限制，速率减半并指数退避
+
+        :param endpoint: API名称
+        :return: 退避的秒数
+        """
+        with self._lock:
+            bucket = self._bucket(endpoint)
+            bucket.rate = max(self.min_rate, bucket.rate / 2)
+            delay = min(self.max_backoff, self.backoff * 2 ** bucket.throttle_count)
+            bucket.throttle_count += 1
+            bucket.blocked_until = time.monotonic() + delay
+            bucket.tokens = 0
+        logger.warning("%s 请求频率出现限制，速率降到每秒%.3f次，暂停%s秒", endpoint, bucket.rate, delay)
+        self.save()
+        return delay
+
+    def _load(self):
+        """读取保存的速率"""
+        if not self.filename or not os.path.exists(self.filename):
+            return {}
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                return json.load(f).get(self.namespace, {})
+        except (OSError, ValueError):
+            logger.warning("无法读取限速文件 %s", self.filename)
+            return {}
+
+    def save(self):
+        """保存学习到的速率"""
+        if not self.filename:
+            return
+        with self._lock:
+            rates = {endpoint: bucket.rate for endpoint, bucket in self._buckets.items()}
+            data = {}
+            if os.path.exists(self.filename):
+                try:
+                    with open(self.filename, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = {}
+            data.setdefault(self.namespace, {}).update(rates)
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_filename, self.filename)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.namespace}>"
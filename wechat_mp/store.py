@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: store.py
+@time: 2026/10/18 15:00
+"""
+import contextlib
+import datetime
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import urllib.parse
+
+import requests
+
+try:
+    import fcntl
+except ImportError:
+    # Windows上没有fcntl，只依靠os.replace保证写入是原子的
+    fcntl = None
+
+logger = logging.getLogger('wechat_mp')
+
+
+def _atomic_write_json(filename, data):
+    """先写入临时文件再替换，读取的一方不会读到写了一半的文件"""
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, filename)
+
+
+class SessionStore:
+    """
+    按账号保存登陆状态，每个账号一个json文件，只保存cookies、请求头和token，
+    不再把所有账号的requests.Session一起pickle到sessions.pkl中。
+    读取时只读取需要的账号，写入时先写临时文件再替换，并且用文件锁避免多个进程同时写入
+
+    :param directory: 保存账号文件的目录
+    """
+
+    def __init__(self, directory="./sessions"):
+        self.directory = directory
+
+    def _path(self, email):
+        return os.path.join(self.directory, urllib.parse.quote(email, safe='') + '.json')
+
+    @contextlib.contextmanager
+    def _locked(self, email):
+        """对账号加文件锁"""
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self._path(email) + '.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def emails(self):
+        """
+        所有保存了登陆状态的账号
+
+        :return: 邮箱列表
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(urllib.parse.unquote(name[:-len('.json')]) for name in os.listdir(self.directory)
+                      if name.endswith('.json'))
+
+    def load(self, email):
+        """
+        读取一个账号的登陆状态
+
+        :param email: 登陆邮箱
+        :return: 账号信息字典，包含email、token、create_time、headers和cookies，没有保存时返回None
+        """
+        path = self._path(email)
+        if not os.path.exists(path):
+            return None
+        with self._locked(email):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    def save(self, email, session, token, **extra):
+        """
+        保存一个账号的登陆状态
+
+        :param email: 登陆邮箱
+        :param session: 已经登陆的requests.Session
+        :param token: 登陆后获取的token
+        :param extra: 其他需要保存的信息
+        """
+        record = dict(extra, email=email, token=token, create_time=int(time.time()),
+                      headers=dict(session.headers), cookies=self.dump_cookies(session.cookies))
+        with self._locked(email):
+            _atomic_write_json(self._path(email), record)
+
+    def update(self, email, **fields):
+        """
+        更新一个账号已经保存的部分信息
+
+        :param email: 登陆邮箱
+        :param fields: 需要更新的字段
+        """
+        path = self._path(email)
+        with self._locked(email):
+            if not os.path.exists(path):
+                return
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+            record.update(fields)
+            _atomic_write_json(path, record)
+
+    def delete(self, email):
+        """
+        删除一个账号的登陆状态
+
+        :param email: 登陆邮箱
+        """
+        with self._locked(email):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._path(email))
+
+    @staticmethod
+    def dump_cookies(cookie_jar):
+        """把cookies转换成可以保存为json的列表"""
+        return [{
+            'name': cookie.name,
+            'value': cookie.value,
+            'domain': cookie.domain,
+            'path': cookie.path,
+            'expires': cookie.expires,
+            'secure': cookie.secure,
+        } for cookie in cookie_jar]
+
+    @staticmethod
+    def restore_session(record):
+        """
+        根据保存的账号信息重建requests.Session
+
+        :param record: :meth:`load` 返回的账号信息
+        :return: requests.Session
+        """
+        session = requests.Session()
+        session.headers.update(record.get('headers') or {})
+        for cookie in record.get('cookies') or []:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                                expires=cookie['expires'], secure=cookie['secure'])
+        return session
+
+    def import_pickle(self, filename="./sessions.pkl"):
+        """
+        把旧版本sessions.pkl中的所有账号导入到这里
+
+        :param filename: 旧版本的pkl文件
+        :return: 导入的账号数量
+        """
+        if not os.path.exists(filename):
+            return 0
+        with open(filename, 'rb') as f:
+            accounts = pickle.load(f, encoding='utf-8')
+        count = 0
+        for email, account in accounts.items():
+            if account.get('session'):
+                self.save(email, account['session'], account.get('token'))
+                count += 1
+        logger.info("从 %s 导入了%s个账号", filename, count)
+        return count
+
+    def __contains__(self, email):
+        return os.path.exists(self._path(email))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.directory}>"
+
+
+class ArticleSyncStore:
+    """
+    记录每个公众号(fakeid)已经同步到的最新图文，
+    供 :meth:`OfficalAccount.sync_articles <wechat_mp.models.OfficalAccount.sync_articles>` 增量同步使用
+
+    :param filename: 保存同步进度的json文件
+    """
+
+    def __init__(self, filename="./article_sync.json"):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._data = {}
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+
+    def get(self, fakeid):
+        """
+        读取公众号已经同步到的最新图文
+
+        :param fakeid: 公众号的fakeid
+        :return: 包含update_time和appmsgid的字典，没有同步过时返回None
+        """
+        return self._data.get(fakeid)
+
+    def update(self, fakeid, update_time, appmsgid):
+        """
+        更新公众号已经同步到的最新图文并保存
+
+        :param fakeid: 公众号的fakeid
+        :param update_time: 最新图文的时间戳
+        :param appmsgid: 最新图文的群发id
+        """
+        with self._lock:
+            self._data[fakeid] = {"update_time": int(update_time), "appmsgid": int(appmsgid)}
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_filename, self.filename)
+
+    def __contains__(self, fakeid):
+        return fakeid in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {len(self._data)}>"
+
+
+class AnalysisStore:
+    """
+    按(账号, 渠道, 日期)保存用户分析的每日数据，按(账号, 日期范围)保存用户属性数据。
+    过去的数据不会再变化，只有最近mutable_days天(默认今天和昨天)的数据每次都重新获取
+
+    :param filename: SQLite文件名
+    :param mutable_days: 仍然可能变化的最近天数
+    """
+
+    def __init__(self, filename="./user_analysis.sqlite3", mutable_days=2):
+        self.filename = filename
+        self.mutable_days = mutable_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filename, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_analysis ("
+                "email TEXT, source INTEGER, date TEXT, body TEXT, fetched_at REAL, PRIMARY KEY (email, source, date))")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_property ("
+                "email TEXT, start_date TEXT, end_date TEXT, body TEXT, fetched_at REAL, "
+                "PRIMARY KEY (email, start_date, end_date))")
+
+    def _mutable_since(self):
+        """从这一天开始的数据仍然可能变化"""
+        return (datetime.date.today() - datetime.timedelta(days=self.mutable_days - 1)).isoformat()
+
+    def get_days(self, email, source, start_date, end_date):
+        """
+        读取保存的每日数据
+
+        :param email: 账号邮箱
+        :param source: 渠道值
+        :param start_date: 开始日期 格式2020-02-25
+        :param end_date: 截止日期 格式2020-02-25
+        :return: 日期到每日数据的字典
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, body FROM user_analysis WHERE email = ? AND source = ? AND date BETWEEN ? AND ?",
+                (email, source, start_date, end_date)).fetchall()
+        return {date: json.loads(body) for date, body in rows}
+
+    def put_days(self, email, source, days):
+        """
+        保存每日数据
+
+        :param email: 账号邮箱
+        :param source: 渠道值
+        :param days: 包含date的每日数据列表
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO user_analysis VALUES (?, ?, ?, ?, ?)",
+                [(email, source, day['date'], json.dumps(day, ensure_ascii=False), now) for day in days])
+
+    def missing_ranges(self, email, source, start_date, end_date):
+        """
+        需要请求的日期范围：没有保存的日期和仍然可能变化的日期，连续的日期合并成一个范围
+
+        :param email: 账号邮箱
+        :param source: 渠道值
+        :param start_date: 开始日期 格式2020-02-25
+        :param end_date: 截止日期 格式2020-02-25
+        :return: (开始日期, 截止日期)字符串元组的列表
+        """
+        stored = self.get_days(email, source, start_date, end_date)
+        mutable_since = self._mutable_since()
+        start = datetime.datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.datetime.strptime(end_date, "%Y-%m-%d").date()
+
+        ranges = []
+        day = start
+        while day <= end:
+            date = day.isoformat()
+            if date not in stored or date >= mutable_since:
+                if ranges and ranges[-1][1] == (day - datetime.timedelta(days=1)).isoformat():
+                    ranges[-1][1] = date
+                else:
+                    ranges.append([date, date])
+            day += datetime.timedelta(days=1)
+        return [tuple(r) for r in ranges]
+
+    def get_property(self, email, start_date, end_date):
+        """
+        读取保存的用户属性数据
+
+        :return: 用户属性字典，没有保存时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM user_property WHERE email = ? AND start_date = ? AND end_date = ?",
+                (email, start_date, end_date)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_property(self, email, start_date, end_date, data):
+        """
+        保存用户属性数据，截止日期仍然可能变化时不保存
+
+        :param data: 用户属性字典
+        """
+        if end_date >= self._mutable_since():
+            return
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO user_property VALUES (?, ?, ?, ?, ?)",
+                               (email, start_date, end_date, json.dumps(data, ensure_ascii=False), time.time()))
+
+    def close(self):
+        """关闭SQLite连接"""
+        self._conn.close()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.filename}>"
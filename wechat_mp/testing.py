@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: testing.py
+@time: 2026/10/18 20:00
+"""
+import base64
+import collections
+import datetime
+import json
+import logging
+import re
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger('wechat_mp')
+
+# 每次请求都会变化、不参与匹配的参数，pwd不写入录制文件
+VOLATILE_PARAMS = {'token', 'random', 'rd', 'r', 'pwd'}
+
+# 响应中出现的token，例如首页链接中的&token=123和json中的"token":"123"，录制时替换成0
+TOKEN_PATTERN = re.compile(r'(token["\']?\s*[=:]\s*["\']?)\d+')
+
+
+def request_key(method, url, body=None):
+    """
+    录制和回放时匹配请求的键：方法、路径、去掉易变参数并排序后的查询参数和表单
+
+    :param method: 请求方法
+    :param url: 完整的地址
+    :param body: 请求体
+    :return: 字符串
+    """
+    parts = urllib.parse.urlsplit(url)
+    params = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+              if k not in VOLATILE_PARAMS]
+    if body:
+        if isinstance(body, bytes):
+            body = body.decode('utf-8', 'replace')
+        form = urllib.parse.parse_qsl(body, keep_blank_values=True)
+        params += [(k, v) for k, v in form if k not in VOLATILE_PARAMS]
+    return f"{method} {parts.path}?{urllib.parse.urlencode(sorted(params))}"
+
+
+def build_response(request, status, content, content_type='application/json'):
+    """
+    构造一个requests.Response
+
+    :param request: PreparedRequest
+    :param status: 状态码
+    :param content: 响应内容，字典会转换成json
+    :param content_type: Content-Type
+    :return: requests.Response
+    """
+    if isinstance(content, (dict, list)):
+        content = json.dumps(content, ensure_ascii=False)
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    response = requests.Response()
+    response.status_code = status
+    response._content = content
+    response.headers = CaseInsensitiveDict({'Content-Type': content_type, 'Content-Length': str(len(content))})
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    response.reason = 'OK' if status == 200 else ''
+    return response
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    真实地发出请求，并把每个请求的响应追加到JSON Lines录制文件中。
+    请求的token和密码不参与匹配也不写入文件，文本响应中的token替换成0，回放时仍然能提取到token
+
+    :param filename: 录制文件
+    """
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(**kwargs)
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        content = response.content
+        try:
+            body, encoding = TOKEN_PATTERN.sub(r'\g<1>0', content.decode('utf-8')), 'text'
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+        record = {
+            'key': request_key(request.method, request.url, request.body),
+            'status': response.status_code,
+            'content_type': response.headers.get('Content-Type', ''),
+            'encoding': encoding,
+            'body': body,
+        }
+        with self._lock, open(self.filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    从录制文件中回放响应，不发出任何网络请求。
+    同一个请求录制了多次时按顺序返回，用完后一直返回最后一次的响应
+
+    :param filename: 录制文件
+    """
+
+    def __init__(self, filename):
+        super().__init__()
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._records = collections.defaultdict(list)
+        self._served = collections.Counter()
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records[record['key']].append(record)
+
+    def send(self, request, **kwargs):
+        key = request_key(request.method, request.url, request.body)
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise requests.exceptions.ConnectionError(f"录制文件 {self.filename} 中没有这个请求：{key}")
+            record = records[min(self._served[key], len(records) - 1)]
+            self._served[key] += 1
+        content = record['body']
+        if record['encoding'] == 'base64':
+            content = base64.b64decode(content)
+        return build_response(request, record['status'], content, record['content_type'])
+
+    def close(self):
+        pass
+
+
+def _png(width=1, height=1):
+    """生成一张白色的PNG图片，用来代替二维码和验证码"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+    raw = b''.join(b'\x00' + b'\xff' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+class FakeBackend(BaseAdapter):
+    """
+    本地的微信后台替身，挂载到session上后代替真实的后台响应登陆、搜索公众号、图文列表、搜索图文和用户分析，
+    可以按设置的频率返回200013模拟频率限制。所有数据都是根据参数确定地生成的
+
+    :param accounts: 搜索公众号能搜到的数量
+    :param articles: 每个公众号的图文数量
+    :param search_articles: 搜索图文能搜到的数量
+    :param throttle_every: 每多少次分页请求返回一次200013，0表示不限制
+    :param token: 登陆后的token
+    :param scan_after: 检查多少次后返回已经扫码确认
+    :param latency: 每个请求模拟的网络延迟，秒
+    """
+
+    def __init__(self, accounts=20, articles=500, search_articles=200, throttle_every=0, token='1234567890',
+                 scan_after=1, latency=0):
+        super().__init__()
+        self.accounts = accounts
+        self.articles = articles
+        self.search_articles = search_articles
+        self.throttle_every = throttle_every
+        self.token = token
+        self.scan_after = scan_after
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.throttled = 0
+        self._paged = 0
+        self._checks = 0
+
+    def send(self, request, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urllib.parse.urlsplit(request.url)
+        params = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        body = request.body or ''
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        if body and not body.startswith('{'):
+            params.update(urllib.parse.parse_qsl(body, keep_blank_values=True))
+        status, content, content_type = self.handle(request.method, parts.path, params)
+        return build_response(request, status, content, content_type)
+
+    def close(self):
+        pass
+
+    def handle(self, method, path, params):
+        """
+        处理一个请求
+
+        :return: (状态码, 响应内容, Content-Type)
+        """
+        action = params.get('action')
+        endpoint = f"{path}?{action}" if action else path
+        with self._lock:
+            self.requests[endpoint] += 1
+
+        if path == '/':
+            return 200, f'<a href="/cgi-bin/home?t=home/index&lang=zh_CN&token={self.token}">首页</a>', 'text/html'
+        if path == '/cgi-bin/bizlogin':
+            if action == 'startlogin':
+                return 200, {'base_resp': {'ret': 0, 'err_msg': 'ok'}}, 'application/json'
+            if action == 'validate':
+                return 200, '<html>扫码验证</html>', 'text/html'
+            return 200, {'base_resp': {'ret': 0, 'err_msg': 'ok'},
+                         'redirect_url': f'/cgi-bin/home?t=home/index&lang=zh_CN&token={self.token}'}, 'application/json'
+        if path == '/cgi-bin/loginqrcode':
+            if action == 'getqrcode':
+                return 200, _png(), 'image/png'
+            with self._lock:
+                self._checks += 1
+                scanned = self._checks >= self.scan_after
+            return 200, {'base_resp': {'ret': 0}, 'status': 1 if scanned else 0}, 'application/json'
+        if path == '/cgi-bin/verifycode':
+            return 200, _png(), 'image/png'
+
+        if params.get('token') != self.token:
+            return 200, {'base_resp': {'ret': 200003, 'err_msg': 'invalid session'}}, 'application/json'
+
+        if path in ('/cgi-bin/searchbiz', '/cgi-bin/appmsg', '/cgi-bin/operate_appmsg'):
+            with self._lock:
+                self._paged += 1
+                throttle = self.throttle_every and self._paged % self.throttle_every == 0
+                if throttle:
+                    self.throttled += 1
+            if throttle:
+                return 200, {'base_resp': {'ret': 200013, 'err_msg': 'freq control'}}, 'application/json'
+        begin, count = int(params.get('begin', 0)), int(params.get('count', 5))
+
+        if path == '/cgi-bin/searchbiz':
+            items = [self.account(i) for i in range(begin, min(begin + count, self.accounts))]
+            return 200, {'base_resp': {'ret': 0}, 'list': items, 'total': self.accounts}, 'application/json'
+        if path == '/cgi-bin/appmsg':
+            items = [self.article(params.get('fakeid', ''), i)
+                     for i in range(begin, min(begin + count, self.articles))]
+            return 200, {'base_resp': {'ret': 0}, 'app_msg_list': items, 'app_msg_cnt': self.articles}, \
+                'application/json'
+        if path == '/cgi-bin/operate_appmsg':
+            items = [self.search_article(params.get('url', ''), i)
+                     for i in range(begin, min(begin + count, self.search_articles))]
+            return 200, {'base_resp': {'ret': 0}, 'list': items, 'total': self.search_articles}, 'application/json'
+        if path == '/misc/useranalysis':
+            if action == 'attr':
+                return 200, self.property_page(), 'text/html'
+            return 200, self.user_analysis(params['begin_date'], params['end_date'], int(params['source'])), \
+                'application/json'
+        return 404, {'base_resp': {'ret': -1, 'err_msg': 'not found'}}, 'application/json'
+
+    @staticmethod
+    def account(i):
+        return {'fakeid': f'MzA{i:08d}==', 'nickname': f'公众号{i}', 'alias': f'account{i}',
+                'round_head_img': f'http://mmbiz.qpic.cn/head/{i}/0', 'service_type': i % 3}
+
+    @staticmethod
+    def article(fakeid, i):
+        appmsgid = 2247480000 - i // 3
+        return {'aid': f'{appmsgid}_{i % 3 + 1}', 'appmsgid': appmsgid, 'itemidx': i % 3 + 1,
+                'cover': f'https://mmbiz.qpic.cn/cover/{fakeid}/{i}/0', 'digest': f'第{i}篇图文的摘要' * 3,
+                'link': f'http://mp.weixin.qq.com/s?__biz={fakeid}&mid={appmsgid}&idx={i % 3 + 1}',
+                'title': f'图文标题{i}', 'update_time': 1580000000 - i * 3600}
+
+    @staticmethod
+    def search_article(keyword, i):
+        return {'article_type': '科技', 'author': f'作者{i % 17}', 'content': f'<p>{keyword}的正文{i}</p>' * 20,
+                'cover_url': f'https://mmbiz.qpic.cn/cover/{i}/0', 'head_img_url': f'http://wx.qlogo.cn/{i}/0',
+                'nickname': f'公众号{i % 50}', 'source_can_reward': i % 2, 'source_reprint_status': 1,
+                'source_url': '', 'title': f'{keyword}相关图文{i}', 'url': f'http://mp.weixin.qq.com/s/{i}'}
+
+    @staticmethod
+    def user_analysis(begin_date, end_date, source):
+        day = datetime.date.fromisoformat(begin_date)
+        end = datetime.date.fromisoformat(end_date)
+        days = []
+        while day <= end:
+            ordinal = day.toordinal()
+            new_user, cancel_user = ordinal % 37 + source % 7, ordinal % 11
+            days.append({'date': day.isoformat(), 'new_user': new_user, 'cancel_user': cancel_user,
+                         'netgain_user': new_user - cancel_user, 'cumulate_user': 10000 + ordinal % 1000})
+            day += datetime.timedelta(days=1)
+        return {'base_resp': {'ret': 0}, 'category_list': [{'user_source': source, 'list': days}]}
+
+    @staticmethod
+    def property_page(entries=50):
+        lists = []
+        for name in ('genders', 'langs', 'provinces', 'cities', 'platforms'):
+            items = ''.join(f'''
+                {{
+                    name: "{name}{i}" || "未知",
+                    count: +("{i * 7}") || 0
+                }},''' for i in range(entries))
+            lists.append(f'''
+            {name}: [{items}
+            ]''')
+        return ('<html><script>\nwindow.cgiData = {\n    list: [\n        {'
+                + ','.join(lists) + '\n        },\n    ]\n};\n</script></html>')
+
+
+def install(client, adapter):
+    """
+    把adapter挂载到client上，之后创建和恢复的session都会使用它
+
+    :param client: WeChat对象
+    :param adapter: 例如 :class:`FakeBackend`、:class:`RecordingAdapter` 或者 :class:`ReplayAdapter`
+    :return: adapter
+    """
+    client.adapter = adapter
+    if client.session is not None:
+        client._mount(client.session)
+    return adapter
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+@version: python3.6
+@author: "Roger Lee"
+@license: MIT Licence
+@contact: 704480843@qq.com
+@file: transport.py
+@time: 2026/10/18 23:00
+"""
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('wechat_mp')
+
+BASE_URL = 'https://mp.weixin.qq.com'
+
+# 新建session的默认请求头
+SESSION_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/63.0.3218.0 Safari/537.36',
+    'Origin': BASE_URL,
+    'Pragma': 'no-cache',
+    'Cache-Control': 'no-cache',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Content-Type': 'application/x-www-form-urlencoded;charset="UTF-8"',
+    'Accept': '*/*',
+    'Referer': BASE_URL + '/',
+}
+
+# 后台页面发出的XHR请求头，Host和Connection由requests根据连接设置
+XHR_HEADERS = {
+    'Origin': BASE_URL,
+    'X-Requested-With': 'XMLHttpRequest',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 '
+                  '(KHTML, like Gecko) Chrome/59.0.3071.115 Safari/537.36',
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+    'Accept': '*/*',
+    'Accept-Language': 'zh-CN,zh;q=0.8',
+}
+
+# 各个API的Referer，{token}为当前账号的token
+REFERERS = {
+    'search article': BASE_URL + '/cgi-bin/appmsg?t=media/appmsg_edit_v2&action=edit&isNew=1&type=10&share=1'
+                                 '&token={token}&lang=zh_CN',
+    'get analysis': BASE_URL + '/misc/useranalysis?=&token={token}&lang=zh_CN',
+    'get property': BASE_URL + '/misc/useranalysis?action=attr&token={token}&lang=zh_CN',
+}
+
+
+class PoolingAdapter(HTTPAdapter):
+    """
+    请求没有指定超时时使用默认超时的HTTPAdapter
+
+    :param timeout: 默认超时，秒，可以是(连接超时, 读取超时)
+    """
+
+    def __init__(self, timeout=(5, 30), **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if timeout is None:
+            timeout = self.timeout
+        return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+
+class Transport:
+    """
+    多个客户端共用的HTTP连接池。
+
+    所有session都挂载同一个 :class:`PoolingAdapter`，不同账号的请求复用同一批keep-alive连接，
+    并发请求的线程数不超过pool_maxsize时不会因为连接池已满而丢弃连接。
+    每个API的请求头预先生成，只在token变化时重新生成一次
+
+    :param pool_connections: 缓存连接池的主机数
+    :param pool_maxsize: 每个主机最多保留的连接数，应该不小于并发请求的线程数
+    :param timeout: 默认超时，秒，可以是(连接超时, 读取超时)
+    :param max_retries: 连接失败时的重试次数
+    :param compress: 是否接受gzip等压缩的响应
+    """
+
+    def __init__(self, pool_connections=4, pool_maxsize=32, timeout=(5, 30), max_retries=0, compress=True):
+        self.adapter = PoolingAdapter(timeout, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                      max_retries=max_retries)
+        # requests不依赖brotli等可选库就能解码的压缩格式
+        encoding = 'gzip, deflate' if compress else 'identity'
+        self.session_headers = dict(SESSION_HEADERS, **{'Accept-Encoding': encoding, 'Connection': 'keep-alive'})
+        self._xhr_headers = dict(XHR_HEADERS, **{'Accept-Encoding': encoding})
+        self._headers = {}
+        self._lock = threading.Lock()
+
+    def mount(self, session):
+        """把共用的连接池挂载到session上"""
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def new_session(self):
+        """创建一个使用共用连接池和默认请求头的session"""
+        session = requests.Session()
+        session.headers = dict(self.session_headers)
+        return self.mount(session)
+
+    def headers(self, endpoint, token):
+        """
+        API的请求头，同一个token返回同一个字典，不要修改它
+
+        :param endpoint: API名称，见 ``REFERERS``
+        :param token: 当前账号的token
+        :return: 请求头字典
+        """
+        key = (endpoint, token)
+        headers = self._headers.get(key)
+        if headers is None:
+            headers = dict(self._xhr_headers, Referer=REFERERS[endpoint].format(token=token))
+            with self._lock:
+                if len(self._headers) >= 1024:
+                    self._headers.clear()
+                self._headers[key] = headers
+        return headers
+
+    def stats(self):
+        """
+        连接池的统计
+
+        :return: 建立的连接数、发出的请求数和每千次请求建立的连接数
+        """
+        connections = requests_count = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_count += pool.num_requests
+        return {
+            'connections': connections,
+            'requests': requests_count,
+            'connections_per_1k': connections * 1000 / requests_count if requests_count else 0,
+        }
+
+    def close(self):
+        """关闭所有连接"""
+        self.adapter.close()
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}: {self.adapter._pool_maxsize}>"
+
+
+# 没有单独设置时，所有客户端共用的连接池
+DEFAULT_TRANSPORT = Transport()
@@ -9,10 +9,10 @@
 """
 
 import hashlib
+import math
+import re
 import time
 
-from bs4 import BeautifulSoup
-
 
 def encrypt(text):
     """
@@ -34,6 +34,8 @@ def parse_html(response):
     """
     将HTML内容封装成BeautifulSoup的对象
     """
+    from bs4 import BeautifulSoup
+
     # 读取返回的内容，编码使用utf-8，放入变量html
     html = response.content.decode('utf-8')
 
@@ -42,3 +44,212 @@ def parse_html(response):
 
     # 返回BeautifulSoup对象
     return soup
+
+
+# JS对象字面量的词法规则：先跳过空白和注释，再匹配一个token。
+# 依次是双引号字符串、单引号字符串、数字、标识符、运算符，其他任意一个字符作为单独的token
+_JS_TOKEN = re.compile(r"""(?:\s+|//[^\n]*|/\*[\s\S]*?\*/)*("(?:[^"\\\n]|\\[\s\S])*"|'(?:[^'\\\n]|\\[\s\S])*'"""
+                       r"""|0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[A-Za-z_$][\w$]*|\|\||&&|[\s\S])""")
+_JS_CONSTANTS = {'true': True, 'false': False, 'null': None, 'undefined': None, 'NaN': math.nan,
+                 'Infinity': math.inf}
+
+
+def _js_truthy(value):
+    """JS的真值判断，空对象和空数组为真"""
+    if isinstance(value, (dict, list)):
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    return bool(value)
+
+
+def _js_number(value):
+    """JS的一元+，把值转换成数字，整数保持为int"""
+    if value is None or isinstance(value, bool):
+        return int(bool(value))
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return 0
+        try:
+            return int(value, 16) if value[:2] in ('0x', '0X') else int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                return math.nan
+    return math.nan
+
+
+# JS字符串中的转义序列，\x和\u后面的位数不对时是语法错误
+_JS_ESCAPE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|[\s\S])')
+_JS_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+               '\n': '', '\r': '', '\r\n': '', '\u2028': '', '\u2029': ''}
+
+
+def _js_unescape(match):
+    escape = match.group(1)
+    first = escape[0]
+    if first in ('u', 'x') and len(escape) > 1:
+        return chr(int(escape[1:].strip('{}'), 16))
+    if first in ('u', 'x'):
+        raise ValueError(f"无效的转义序列：\\{escape}")
+    # \0后面跟数字是八进制转义，对象字面量中不会出现
+    return _JS_ESCAPES.get(escape, escape)
+
+
+def _js_string(token):
+    """把字符串token转换成Python字符串，支持JS的所有转义序列，\\u表示的代理对合并成一个字符"""
+    body = token[1:-1]
+    if '\\' not in body:
+        return body
+    body = _JS_ESCAPE.sub(_js_unescape, body)
+    if any('\ud800' <= char <= '\udfff' for char in body):
+        body = body.encode('utf-16', 'surrogatepass').decode('utf-16')
+    return body
+
+
+class _JSParser:
+    """
+    JS对象字面量的解析器。_JS_TOKEN逐个产生token，整个文本只扫描一遍，
+    支持不带引号的键、单引号字符串、注释、末尾逗号以及 ``+("1") || 0`` 这样的表达式
+    """
+
+    def __init__(self, text, pos=0):
+        self.text = text
+        self._tokens = _JS_TOKEN.finditer(text, pos)
+        self._token_end = pos
+        self.token = None
+        self.end = pos
+        self.advance()
+
+    def advance(self):
+        """消费当前的token并读取下一个"""
+        token = self.token
+        self.end = self._token_end
+        match = next(self._tokens, None)
+        if match is None:
+            self.token, self._token_end = '', len(self.text)
+        else:
+            self.token, self._token_end = match.group(1), match.end()
+        return token
+
+    def error(self, message):
+        return ValueError(f"{message}，位置{self.end}：{self.text[self.end:self.end + 30]!r}")
+
+    def expect(self, char):
+        if self.token != char:
+            raise self.error(f"需要 {char}")
+        self.advance()
+
+    def parse_expression(self):
+        value = self.parse_and()
+        while self.token == '||':
+            self.advance()
+            right = self.parse_and()
+            if not _js_truthy(value):
+                value = right
+        return value
+
+    def parse_and(self):
+        value = self.parse_unary()
+        while self.token == '&&':
+            self.advance()
+            right = self.parse_unary()
+            if _js_truthy(value):
+                value = right
+        return value
+
+    def parse_unary(self):
+        operator = self.token
+        if operator in ('+', '-', '!'):
+            self.advance()
+            value = self.parse_unary()
+            if operator == '!':
+                return not _js_truthy(value)
+            number = _js_number(value)
+            return -number if operator == '-' else number
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.token
+        if token == '{':
+            return self.parse_object()
+        if token == '[':
+            return self.parse_array()
+        if token == '(':
+            self.advance()
+            value = self.parse_expression()
+            self.expect(')')
+            return value
+        first = token[:1]
+        if first == '"' or first == "'":
+            self.advance()
+            return _js_string(token)
+        if first.isdigit() or (first == '.' and len(token) > 1):
+            self.advance()
+            return _js_number(token)
+        if token in _JS_CONSTANTS:
+            self.advance()
+            return _JS_CONSTANTS[token]
+        raise self.error("无法解析的值")
+
+    def parse_object(self):
+        self.advance()
+        result = {}
+        while self.token != '}':
+            token = self.advance()
+            first = token[:1]
+            if first == '"' or first == "'":
+                key = _js_string(token)
+            elif first.isalnum() or first in ('_', '$'):
+                key = token
+            else:
+                raise self.error("无法解析的键")
+            self.expect(':')
+            result[key] = self.parse_expression()
+            if self.token != ',':
+                break
+            self.advance()
+        self.expect('}')
+        return result
+
+    def parse_array(self):
+        self.advance()
+        result = []
+        while self.token != ']':
+            result.append(self.parse_expression())
+            if self.token != ',':
+                break
+            self.advance()
+        self.expect(']')
+        return result
+
+
+def parse_js_object(text, pos=0):
+    """
+    把JS的对象字面量一次性转换成Python数据
+
+    :param text: 包含对象字面量的文本
+    :param pos: 对象字面量开始的位置
+    :return: (解析结果, 结束位置)
+    """
+    parser = _JSParser(text, pos)
+    value = parser.parse_expression()
+    return value, parser.end
+
+
+def extract_cgi_data(html, name='cgiData'):
+    """
+    提取后台页面中 ``window.cgiData = {...};`` 的数据
+
+    :param html: 页面内容
+    :param name: window上的变量名
+    :return: 解析后的数据
+    """
+    match = re.search(r'window\.' + re.escape(name) + r'\s*=\s*', html)
+    if not match:
+        raise ValueError(f"页面中没有找到window.{name}")
+    return parse_js_object(html, match.end())[0]